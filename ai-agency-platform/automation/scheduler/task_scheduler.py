@@ -1,38 +1,87 @@
 import asyncio
+import heapq
+import inspect
 import logging
 import time
-import json
+import uuid
+import orjson
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable, Awaitable
+from typing import Dict, List, Literal, Optional, Any, Callable, Awaitable, Set, Tuple, Union
 import os
 import signal
 import sys
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger("task-scheduler")
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Snapshot key holding the id of the snapshot, which the journal's header line
+# repeats; a journal whose header names another snapshot is already folded in
+_GENERATION_KEY = "__generation__"
+
+# fdatasync skips flushing file metadata where the platform supports it
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+def _epoch_property(name: str, ts_attr: str) -> property:
+    """A datetime attribute backed by epoch seconds, materialized lazily.
+    
+    Accepts a datetime, epoch seconds or None on assignment.
+    """
+    dt_attr = f"_{name}"
+    
+    def getter(self) -> Optional[datetime]:
+        value = getattr(self, dt_attr)
+        if value is None:
+            ts = getattr(self, ts_attr)
+            if ts is None:
+                return None
+            value = datetime.fromtimestamp(ts)
+            setattr(self, dt_attr, value)
+        return value
+    
+    def setter(self, value):
+        if isinstance(value, datetime):
+            setattr(self, dt_attr, value)
+            setattr(self, ts_attr, value.timestamp())
+        else:
+            setattr(self, dt_attr, None)
+            setattr(self, ts_attr, value)
+        self._iso_cache.pop(name, None)
+    
+    return property(getter, setter)
+
 class Task:
     """Represents a scheduled task with metadata and execution details."""
     
+    __slots__ = (
+        "task_id", "task_type", "params", "_schedule_time", "schedule_ts",
+        "priority", "max_retries", "retry_delay", "timeout", "callback_url",
+        "status", "retry_count", "_start_time", "_start_ts", "_end_time",
+        "_end_ts", "result", "error", "_iso_cache", "_handler",
+    )
+    
     def __init__(
         self,
         task_id: str,
         task_type: str,
         params: Dict[str, Any],
-        schedule_time: datetime,
+        schedule_time: Union[datetime, float],
         priority: int = 1,
         max_retries: int = 3,
         retry_delay: int = 300,  # 5 minutes
         timeout: int = 3600,  # 1 hour
         callback_url: Optional[str] = None
     ):
+        # Memoized isoformat() strings, invalidated by the datetime setters below
+        self._iso_cache: Dict[str, str] = {}
+        
         self.task_id = task_id
         self.task_type = task_type
-        self.params = params
+        # Tasks built from the same template repeat the same keys; intern them
+        # so thousands of stored tasks share one string per key
+        self.params = {sys.intern(k) if isinstance(k, str) else k: v for k, v in params.items()}
         self.schedule_time = schedule_time
         self.priority = priority
         self.max_retries = max_retries
@@ -43,10 +92,29 @@ class Task:
         # Runtime attributes
         self.status = "scheduled"  # scheduled, running, completed, failed, cancelled
         self.retry_count = 0
-        self.start_time: Optional[datetime] = None
-        self.end_time: Optional[datetime] = None
+        self.start_time = None
+        self.end_time = None
         self.result: Optional[Any] = None
         self.error: Optional[str] = None
+        # Handler resolved by the scheduler, cached to skip per-run lookups
+        self._handler: Optional[Callable[['Task'], Any]] = None
+    
+    # Times are stored as epoch seconds (schedule_ts is compared against
+    # time.time() on the scheduling hot path) and only turned into datetimes
+    # when read, so loading persisted tasks never parses a date string
+    schedule_time = _epoch_property("schedule_time", "schedule_ts")
+    start_time = _epoch_property("start_time", "_start_ts")
+    end_time = _epoch_property("end_time", "_end_ts")
+    
+    def _iso(self, name: str) -> Optional[str]:
+        """Return the cached isoformat() string for a datetime attribute."""
+        cached = self._iso_cache.get(name)
+        if cached is None:
+            value = getattr(self, name)
+            if value is None:
+                return None
+            cached = self._iso_cache[name] = value.isoformat()
+        return cached
         
     def to_dict(self) -> Dict[str, Any]:
         """Convert the task to a dictionary for serialization."""
@@ -54,7 +122,7 @@ class Task:
             "task_id": self.task_id,
             "task_type": self.task_type,
             "params": self.params,
-            "schedule_time": self.schedule_time.isoformat(),
+            "schedule_time": self._iso("schedule_time"),
             "priority": self.priority,
             "max_retries": self.max_retries,
             "retry_delay": self.retry_delay,
@@ -62,20 +130,45 @@ class Task:
             "callback_url": self.callback_url,
             "status": self.status,
             "retry_count": self.retry_count,
-            "start_time": self.start_time.isoformat() if self.start_time else None,
-            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "start_time": self._iso("start_time"),
+            "end_time": self._iso("end_time"),
+            "result": self.result,
+            "error": self.error
+        }
+    
+    def to_record(self) -> Dict[str, Any]:
+        """Convert the task to its persisted form, with times as epoch seconds."""
+        return {
+            "task_id": self.task_id,
+            "task_type": self.task_type,
+            "params": self.params,
+            "schedule_ts": self.schedule_ts,
+            "priority": self.priority,
+            "max_retries": self.max_retries,
+            "retry_delay": self.retry_delay,
+            "timeout": self.timeout,
+            "callback_url": self.callback_url,
+            "status": self.status,
+            "retry_count": self.retry_count,
+            "start_ts": self._start_ts,
+            "end_ts": self._end_ts,
             "result": self.result,
             "error": self.error
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Task':
-        """Create a Task from a dictionary."""
+        """Create a Task from a dictionary produced by to_dict or to_record."""
+        if "schedule_ts" in data:
+            schedule_time = data["schedule_ts"]
+        else:
+            schedule_time = datetime.fromisoformat(data["schedule_time"])
+        
         task = cls(
             task_id=data["task_id"],
             task_type=data["task_type"],
             params=data["params"],
-            schedule_time=datetime.fromisoformat(data["schedule_time"]),
+            schedule_time=schedule_time,
             priority=data.get("priority", 1),
             max_retries=data.get("max_retries", 3),
             retry_delay=data.get("retry_delay", 300),
@@ -86,10 +179,14 @@ class Task:
         task.status = data.get("status", "scheduled")
         task.retry_count = data.get("retry_count", 0)
         
-        if data.get("start_time"):
+        if data.get("start_ts") is not None:
+            task.start_time = data["start_ts"]
+        elif data.get("start_time"):
             task.start_time = datetime.fromisoformat(data["start_time"])
         
-        if data.get("end_time"):
+        if data.get("end_ts") is not None:
+            task.end_time = data["end_ts"]
+        elif data.get("end_time"):
             task.end_time = datetime.fromisoformat(data["end_time"])
             
         task.result = data.get("result")
@@ -100,30 +197,114 @@ class Task:
 class TaskScheduler:
     """A scheduler for managing and executing asynchronous tasks."""
     
-    def __init__(self, max_concurrent_tasks: int = 5, storage_path: str = None):
+    def __init__(
+        self,
+        max_concurrent_tasks: int = 5,
+        storage_path: str = None,
+        compaction_interval: float = 60.0,
+        durable: bool = False,
+        max_cpu_tasks: Optional[int] = None,
+        pretty: bool = False
+    ):
         self.tasks: Dict[str, Task] = {}
-        self.task_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        # Task IDs grouped by status; kept in sync by _add_task/_set_status
+        self._by_status: Dict[str, Set[str]] = defaultdict(set)
+        # Earliest-deadline heap of (schedule_ts, priority, task_id); entries for
+        # cancelled or rescheduled tasks are left in place and skipped when popped
+        self._heap: List[Tuple[float, int, str]] = []
+        self._wakeup = asyncio.Event()
         self.max_concurrent_tasks = max_concurrent_tasks
+        self.max_cpu_tasks = max_cpu_tasks or os.cpu_count() or 1
+        # I/O-bound and CPU-bound handlers draw from separate pools so that
+        # slow network tasks never hold the slots compute tasks need. A due task
+        # whose pool is full waits in that pool's ready queue, in heap order.
+        self._limits = {"io": self.max_concurrent_tasks, "cpu": self.max_cpu_tasks}
+        self._active = {"io": 0, "cpu": 0}
+        self._ready: Dict[str, deque] = {"io": deque(), "cpu": deque()}
         self.running_tasks: Dict[str, asyncio.Task] = {}
         self.storage_path = storage_path or "tasks.json"
-        self.handlers: Dict[str, Callable[[Task], Awaitable[Any]]] = {}
+        self.journal_path = f"{self.storage_path}.journal"
+        self.compaction_interval = compaction_interval
+        # Sync journal batches and snapshots to disk before acknowledging them
+        self.durable = durable
+        # Indent the snapshot for human inspection; compact by default
+        self._dump_options = orjson.OPT_INDENT_2 if pretty else 0
+        self.handlers: Dict[str, Callable[[Task], Any]] = {}
+        self._kinds: Dict[str, str] = {}
         self.is_running = False
+        # Shared HTTP session for callbacks, created in start()
+        self._http = None
+        self._callback_sem = asyncio.Semaphore(max_concurrent_tasks)
+        self._generation: Optional[str] = None
         self.load_tasks()
+        # State changes are appended here and folded into the snapshot by the compactor
+        self._journal = open(self.journal_path, 'ab', buffering=0)
+        if self._journal.tell() == 0:
+            self._journal.write(self._journal_header())
+        # IDs of tasks changed since the last journal flush
+        self._dirty: Set[str] = set()
+        self._flush_event = asyncio.Event()
+        # Single thread that performs all journal and snapshot writes
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-scheduler-io")
+        
+    def register_handler(
+        self,
+        task_type: str,
+        handler: Callable[[Task], Any],
+        kind: Literal["io", "cpu"] = "io"
+    ):
+        """Register a handler function for a specific task type.
         
-    def register_handler(self, task_type: str, handler: Callable[[Task], Awaitable[Any]]):
-        """Register a handler function for a specific task type."""
+        "io" handlers are coroutine functions run on the event loop. "cpu"
+        handlers are plain functions run in a worker thread, so they don't
+        block the loop; a timeout stops waiting on them but cannot interrupt
+        the thread itself.
+        """
+        if kind not in ("io", "cpu"):
+            raise ValueError(f"Unknown handler kind: {kind}")
+        if kind == "cpu" and inspect.iscoroutinefunction(handler):
+            raise ValueError(f"CPU handler for {task_type} must be a plain function, not a coroutine function")
         self.handlers[task_type] = handler
-        logger.info(f"Registered handler for task type: {task_type}")
+        self._kinds[task_type] = kind
+        logger.info("Registered %s handler for task type: %s", kind, task_type)
         
     def schedule_task(self, task: Task) -> str:
-        """Schedule a new task for execution."""
-        self.tasks[task.task_id] = task
-        priority_item = (task.priority, task.schedule_time.timestamp(), task.task_id)
-        self.task_queue.put_nowait((priority_item, task.task_id))
-        self.save_tasks()
-        logger.info(f"Scheduled task {task.task_id} of type {task.task_type} for {task.schedule_time}")
+        """Schedule a new task for execution.
+        
+        Raises KeyError if no handler is registered for the task's type.
+        """
+        handler = self.handlers.get(task.task_type)
+        if handler is None:
+            raise KeyError(f"No handler registered for task type: {task.task_type}")
+        task._handler = handler
+        
+        self._add_task(task)
+        self._push(task)
+        self._record(task)
+        logger.info("Scheduled task %s of type %s for %s", task.task_id, task.task_type, task.schedule_time)
         return task.task_id
     
+    def _add_task(self, task: Task):
+        """Store a task and index it by status."""
+        # One shared string for the dict key, status index and heap entries
+        task.task_id = sys.intern(task.task_id)
+        previous = self.tasks.get(task.task_id)
+        if previous is not None:
+            self._by_status[previous.status].discard(task.task_id)
+        self.tasks[task.task_id] = task
+        self._by_status[task.status].add(task.task_id)
+    
+    def _set_status(self, task: Task, status: str):
+        """Change a task's status, keeping the status index in sync."""
+        self._by_status[task.status].discard(task.task_id)
+        task.status = status
+        self._by_status[status].add(task.task_id)
+    
+    def _push(self, task: Task):
+        """Add a task to the execution heap and wake the worker."""
+        heapq.heappush(self._heap, (task.schedule_ts, task.priority, task.task_id))
+        self._wakeup.set()
+    
     def cancel_task(self, task_id: str) -> bool:
         """Cancel a scheduled task if it hasn't started yet."""
         if task_id not in self.tasks:
@@ -131,14 +312,14 @@ class TaskScheduler:
             
         task = self.tasks[task_id]
         if task.status in ["scheduled", "running"]:
-            task.status = "cancelled"
+            self._set_status(task, "cancelled")
             
             # If the task is currently running, cancel it
             if task_id in self.running_tasks:
                 self.running_tasks[task_id].cancel()
                 
-            self.save_tasks()
-            logger.info(f"Cancelled task {task_id}")
+            self._record(task)
+            logger.info("Cancelled task %s", task_id)
             return True
         return False
     
@@ -152,88 +333,99 @@ class TaskScheduler:
     
     def get_tasks_by_status(self, status: str) -> List[Task]:
         """Get tasks filtered by status."""
-        return [task for task in self.tasks.values() if task.status == status]
+        return [self.tasks[task_id] for task_id in self._by_status.get(status, ())]
     
     async def _execute_task(self, task: Task):
         """Execute a single task with its registered handler."""
-        if task.task_type not in self.handlers:
-            task.status = "failed"
+        if task._handler is None:
+            # Tasks restored from storage are bound on their first run
+            task._handler = self.handlers.get(task.task_type)
+        
+        if task._handler is None:
+            self._set_status(task, "failed")
             task.error = f"No handler registered for task type: {task.task_type}"
             logger.error(task.error)
-            self.save_tasks()
+            self._record(task)
+            self.running_tasks.pop(task.task_id, None)
             return
         
-        # Update task status
-        task.status = "running"
-        task.start_time = datetime.now()
-        self.save_tasks()
-        
         try:
-            handler = self.handlers[task.task_type]
-            logger.info(f"Executing task {task.task_id} of type {task.task_type}")
-            
-            # Execute with timeout
-            result = await asyncio.wait_for(handler(task), timeout=task.timeout)
+            result = await self._run_handler(task)
             
-            task.status = "completed"
+            self._set_status(task, "completed")
             task.result = result
-            logger.info(f"Task {task.task_id} completed successfully")
+            logger.info("Task %s completed successfully", task.task_id)
             
         except asyncio.TimeoutError:
-            task.status = "failed"
+            self._set_status(task, "failed")
             task.error = f"Task execution timed out after {task.timeout} seconds"
-            logger.error(f"Task {task.task_id} timed out")
-            
-            # Handle retry logic
-            if task.retry_count < task.max_retries:
-                task.retry_count += 1
-                task.status = "scheduled"
-                task.schedule_time = datetime.now() + timedelta(seconds=task.retry_delay)
-                priority_item = (task.priority, task.schedule_time.timestamp(), task.task_id)
-                await self.task_queue.put((priority_item, task.task_id))
-                logger.info(f"Task {task.task_id} rescheduled for retry #{task.retry_count}")
+            logger.error("Task %s timed out", task.task_id)
+            self._reschedule_for_retry(task)
             
         except Exception as e:
-            task.status = "failed"
+            self._set_status(task, "failed")
             task.error = str(e)
-            logger.error(f"Task {task.task_id} failed with error: {e}")
-            
-            # Handle retry logic
-            if task.retry_count < task.max_retries:
-                task.retry_count += 1
-                task.status = "scheduled"
-                task.schedule_time = datetime.now() + timedelta(seconds=task.retry_delay)
-                priority_item = (task.priority, task.schedule_time.timestamp(), task.task_id)
-                await self.task_queue.put((priority_item, task.task_id))
-                logger.info(f"Task {task.task_id} rescheduled for retry #{task.retry_count}")
+            logger.error("Task %s failed with error: %s", task.task_id, e)
+            self._reschedule_for_retry(task)
         
         finally:
             task.end_time = datetime.now()
-            # Remove from running tasks
-            if task.task_id in self.running_tasks:
-                del self.running_tasks[task.task_id]
-            self.save_tasks()
+            self._record(task)
             
-            # Handle callbacks
-            if task.callback_url and task.status in ["completed", "failed"]:
-                await self._send_callback(task)
+            try:
+                # Handle callbacks before giving up the slot, so a slow callback
+                # endpoint throttles dispatch instead of piling up coroutines
+                if task.callback_url and task.status in ["completed", "failed"]:
+                    await self._send_callback(task)
+            finally:
+                # Remove from running tasks
+                if task.task_id in self.running_tasks:
+                    del self.running_tasks[task.task_id]
+                # A concurrency slot just freed up
+                self._wakeup.set()
+    
+    def _reschedule_for_retry(self, task: Task) -> bool:
+        """Put a failed task back on the heap if it has retries left."""
+        if task.retry_count >= task.max_retries:
+            return False
+        
+        task.retry_count += 1
+        self._set_status(task, "scheduled")
+        task.schedule_time = datetime.now() + timedelta(seconds=task.retry_delay)
+        self._push(task)
+        logger.info("Task %s rescheduled for retry #%s", task.task_id, task.retry_count)
+        return True
+    
+    async def _run_handler(self, task: Task) -> Any:
+        """Run a task's handler on the loop, or in a worker thread for "cpu" handlers."""
+        handler = task._handler
+        is_cpu = self._kinds.get(task.task_type) == "cpu"
+        
+        # Update task status
+        self._set_status(task, "running")
+        task.start_time = datetime.now()
+        self._record(task)
+        logger.info("Executing task %s of type %s", task.task_id, task.task_type)
+        
+        # Execute with timeout
+        call = asyncio.to_thread(handler, task) if is_cpu else handler(task)
+        return await asyncio.wait_for(call, timeout=task.timeout)
     
     async def _send_callback(self, task: Task):
         """Send a callback notification for a completed or failed task."""
         try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
+            async with self._callback_sem:
+                async with self._http.post(
                     task.callback_url,
-                    json=task.to_dict(),
-                    headers={"Content-Type": "application/json"}
+                    data=orjson.dumps(task.to_dict()),
+                    headers=_JSON_HEADERS
                 ) as response:
                     if response.status >= 400:
-                        logger.warning(f"Callback for task {task.task_id} failed with status {response.status}")
+                        logger.warning("Callback for task %s failed with status %s", task.task_id, response.status)
                     else:
-                        logger.info(f"Callback for task {task.task_id} sent successfully")
+                        logger.info("Callback for task %s sent successfully", task.task_id)
         except Exception as e:
-            logger.error(f"Failed to send callback for task {task.task_id}: {e}")
+            logger.error("Failed to send callback for task %s: %s", task.task_id, e)
     
     async def _worker(self):
         """Task scheduler worker process that handles the execution queue."""
@@ -241,78 +433,208 @@ class TaskScheduler:
         
         while self.is_running:
             try:
-                # Check if we can take more tasks
-                if len(self.running_tasks) >= self.max_concurrent_tasks:
-                    await asyncio.sleep(1)
-                    continue
-                
-                # Get the next task from the queue
-                try:
-                    (_, task_id) = await asyncio.wait_for(self.task_queue.get(), timeout=1)
-                except asyncio.TimeoutError:
-                    continue
+                # Cleared before inspecting state so that any push or freed slot
+                # after this point interrupts the wait below
+                self._wakeup.clear()
+                timeout = None
                 
-                if task_id not in self.tasks:
-                    logger.warning(f"Task {task_id} not found in tasks dictionary")
-                    self.task_queue.task_done()
-                    continue
+                # Start waiting tasks in pools that have free slots
+                for kind, ready in self._ready.items():
+                    while ready and self._active[kind] < self._limits[kind]:
+                        self._dispatch(*ready.popleft())
                 
-                task = self.tasks[task_id]
-                
-                # Skip if task is cancelled
-                if task.status == "cancelled":
-                    self.task_queue.task_done()
-                    continue
-                
-                # Check if it's time to execute the task
-                now = datetime.now()
-                if task.schedule_time > now:
-                    # Re-queue with the same priority
-                    priority_item = (task.priority, task.schedule_time.timestamp(), task.task_id)
-                    await self.task_queue.put((priority_item, task_id))
-                    self.task_queue.task_done()
-                    await asyncio.sleep(1)
-                    continue
+                # Move every due task into its pool's ready queue, starting it
+                # right away if the pool has room, and sleep until the next is due
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    schedule_ts, _, task_id = heapq.heappop(self._heap)
+                    task = self.tasks.get(task_id)
+                    kind = self._kind_of(task) if task is not None else "io"
+                    if self._ready[kind] or self._active[kind] >= self._limits[kind]:
+                        self._ready[kind].append((task_id, schedule_ts))
+                    else:
+                        self._dispatch(task_id, schedule_ts)
+                if self._heap:
+                    timeout = self._heap[0][0] - now
                 
-                # Execute the task
-                runner = asyncio.create_task(self._execute_task(task))
-                self.running_tasks[task_id] = runner
-                self.task_queue.task_done()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
             
             except asyncio.CancelledError:
                 logger.info("Worker task was cancelled")
                 break
             except Exception as e:
-                logger.error(f"Error in worker task: {e}")
+                logger.error("Error in worker task: %s", e)
                 await asyncio.sleep(5)  # Avoid tight loop in case of persistent errors
     
-    def save_tasks(self):
-        """Save tasks to persistent storage."""
+    def _record(self, task: Task):
+        """Mark a task as changed; the flusher journals it shortly after."""
+        self._dirty.add(task.task_id)
+        self._flush_event.set()
+    
+    async def _flush(self):
+        """Append every dirty task to the journal in a single write."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
         try:
-            with open(self.storage_path, 'w') as f:
-                task_data = {task_id: task.to_dict() for task_id, task in self.tasks.items()}
-                json.dump(task_data, f, indent=2)
+            payload = b"".join(
+                orjson.dumps({"id": task_id, "op": "upsert", "data": self.tasks[task_id].to_record()}) + b"\n"
+                for task_id in dirty if task_id in self.tasks
+            )
+            await self._run_io(self._write_journal, payload)
         except Exception as e:
-            logger.error(f"Failed to save tasks: {e}")
+            logger.error("Failed to journal %s tasks: %s", len(dirty), e)
+    
+    def _write_journal(self, payload: bytes):
+        """Append a batch to the journal, syncing it once if durable."""
+        self._journal.write(payload)
+        if self.durable:
+            _datasync(self._journal.fileno())
+    
+    def _run_io(self, func, *args) -> Awaitable[Any]:
+        """Run blocking file I/O on the single writer thread.
+        
+        Journal appends and snapshots are submitted from the event loop in
+        the order their payloads were built, and the one-thread executor keeps
+        that order on disk even if the awaiting coroutine is cancelled.
+        """
+        return asyncio.get_running_loop().run_in_executor(self._writer, func, *args)
+    
+    async def _flusher(self):
+        """Coalesce state changes into batched journal writes."""
+        while self.is_running:
+            await self._flush_event.wait()
+            self._flush_event.clear()
+            await self._flush()
+            # Let transitions from the next few loop iterations pile up
+            await asyncio.sleep(0.01)
+    
+    def _dispatch(self, task_id: str, schedule_ts: float):
+        """Start executing a task popped from the heap."""
+        if task_id not in self.tasks:
+            logger.warning("Task %s not found in tasks dictionary", task_id)
+            return
+        
+        task = self.tasks[task_id]
+        
+        # Skip cancelled (or otherwise no longer scheduled) tasks, and entries
+        # superseded by a later push for the same task, e.g. a reschedule
+        if task.status != "scheduled" or task.schedule_ts != schedule_ts:
+            return
+        
+        # Execute the task, holding a slot in its pool until the runner finishes
+        kind = self._kind_of(task)
+        self._active[kind] += 1
+        runner = asyncio.create_task(self._execute_task(task))
+        runner.add_done_callback(lambda _: self._release_slot(kind))
+        self.running_tasks[task_id] = runner
+    
+    def _kind_of(self, task: Task) -> str:
+        """Pool a task runs in, by the kind its handler was registered with."""
+        return self._kinds.get(task.task_type, "io")
+    
+    def _release_slot(self, kind: str):
+        """Free a slot in a pool and wake the worker to fill it."""
+        self._active[kind] -= 1
+        self._wakeup.set()
+    
+    async def save_tasks(self):
+        """Write a full snapshot to persistent storage and truncate the journal."""
+        try:
+            task_data = {task_id: task.to_record() for task_id, task in self.tasks.items()}
+            # Every pending change is covered by this snapshot
+            self._dirty.clear()
+            await self._run_io(self._write_snapshot, task_data)
+        except Exception as e:
+            logger.error("Failed to save tasks: %s", e)
+    
+    def _journal_header(self) -> bytes:
+        """First journal line, naming the snapshot the journal applies to."""
+        return orjson.dumps({"op": "header", "generation": self._generation}) + b"\n"
+    
+    def _write_snapshot(self, task_data: Dict[str, Dict[str, Any]]):
+        """Encode and atomically replace the snapshot, then truncate the journal."""
+        generation = uuid.uuid4().hex
+        task_data[_GENERATION_KEY] = generation
+        tmp_path = f"{self.storage_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(task_data, option=self._dump_options))
+            if self.durable:
+                f.flush()
+                _datasync(f.fileno())
+        os.replace(tmp_path, self.storage_path)
+        self._generation = generation
+        
+        # Everything in the journal is now covered by the snapshot. A crash
+        # before this point leaves a journal naming the previous snapshot,
+        # which load_tasks() skips rather than replaying older states.
+        self._journal.seek(0)
+        self._journal.truncate()
+        self._journal.write(self._journal_header())
     
     def load_tasks(self):
-        """Load tasks from persistent storage."""
+        """Load tasks from the snapshot, then replay the journal on top of it."""
         try:
             if os.path.exists(self.storage_path):
-                with open(self.storage_path, 'r') as f:
-                    task_data = json.load(f)
-                    for task_id, data in task_data.items():
-                        task = Task.from_dict(data)
-                        self.tasks[task_id] = task
-                        
-                        # Only re-queue scheduled tasks
-                        if task.status == "scheduled":
-                            priority_item = (task.priority, task.schedule_time.timestamp(), task.task_id)
-                            self.task_queue.put_nowait((priority_item, task_id))
+                with open(self.storage_path, 'rb') as f:
+                    task_data = orjson.loads(f.read())
+            else:
+                task_data = {}
+            self._generation = task_data.pop(_GENERATION_KEY, None)
+            
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'rb+') as f:
+                    data = f.read()
+                    # Cut off a final line torn by a crash mid-write, so that
+                    # new entries are not appended onto it
+                    if data and not data.endswith(b"\n"):
+                        data = data[:data.rfind(b"\n") + 1]
+                        f.truncate(len(data))
+                        logger.warning("Dropped a torn final entry from %s", self.journal_path)
                     
-                    logger.info(f"Loaded {len(task_data)} tasks from storage")
+                    lines = data.splitlines()
+                    header = orjson.loads(lines[0]) if lines else {}
+                    if header.get("generation") != self._generation:
+                        # Left by a crash mid-compaction; its changes are in the snapshot
+                        logger.warning("Discarding journal %s written before the last snapshot", self.journal_path)
+                        f.truncate(0)
+                        lines = []
+                
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        logger.warning("Skipping corrupt journal entry in %s", self.journal_path)
+                        continue
+                    if entry.get("op") == "upsert":
+                        task_data[entry["id"]] = entry["data"]
+            
+            for data in task_data.values():
+                task = Task.from_dict(data)
+                self._add_task(task)
+                
+                # Only re-queue scheduled tasks
+                if task.status == "scheduled":
+                    self._push(task)
+            
+            if self.tasks:
+                logger.info("Loaded %s tasks from storage", len(self.tasks))
         except Exception as e:
-            logger.error(f"Failed to load tasks: {e}")
+            logger.error("Failed to load tasks: %s", e)
+    
+    async def _compactor(self):
+        """Periodically fold the journal into a fresh snapshot."""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.compaction_interval)
+                await self.save_tasks()
+            except asyncio.CancelledError:
+                break
     
     async def start(self):
         """Start the task scheduler."""
@@ -320,42 +642,67 @@ class TaskScheduler:
             return
             
         self.is_running = True
+        
+        import aiohttp
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrent_tasks * 4, ttl_dns_cache=300)
+        )
+        
         self.worker_task = asyncio.create_task(self._worker())
+        self.compactor_task = asyncio.create_task(self._compactor())
+        self.flusher_task = asyncio.create_task(self._flusher())
         logger.info("Task scheduler started")
         
         # Setup signal handlers for graceful shutdown
+        loop = asyncio.get_running_loop()
         for sig in (signal.SIGINT, signal.SIGTERM):
-            asyncio.get_event_loop().add_signal_handler(
-                sig, lambda s=sig: asyncio.create_task(self.shutdown(sig))
-            )
+            loop.add_signal_handler(sig, self._on_signal, sig)
+    
+    def _on_signal(self, sig: signal.Signals):
+        """Begin a graceful shutdown in response to a signal."""
+        asyncio.get_running_loop().create_task(self.shutdown(sig))
     
     async def shutdown(self, signal=None):
         """Shutdown the task scheduler gracefully."""
         if signal:
-            logger.info(f"Received exit signal {signal.name}")
+            logger.info("Received exit signal %s", signal.name)
             
         logger.info("Shutting down task scheduler...")
         self.is_running = False
         
-        # Cancel the worker task
-        if hasattr(self, 'worker_task'):
-            self.worker_task.cancel()
-            try:
-                await self.worker_task
-            except asyncio.CancelledError:
-                pass
+        # Cancel the worker and compactor tasks
+        for background in ('worker_task', 'compactor_task'):
+            if hasattr(self, background):
+                getattr(self, background).cancel()
+                try:
+                    await getattr(self, background)
+                except asyncio.CancelledError:
+                    pass
+        
+        # Let the flusher drain any batch it has already collected
+        if hasattr(self, 'flusher_task'):
+            self._flush_event.set()
+            await self.flusher_task
         
         # Cancel all running tasks
         if self.running_tasks:
-            logger.info(f"Cancelling {len(self.running_tasks)} running tasks")
+            logger.info("Cancelling %s running tasks", len(self.running_tasks))
+            runners = list(self.running_tasks.values())
             for task_id, task in list(self.running_tasks.items()):
                 task.cancel()
-                self.tasks[task_id].status = "cancelled"
-                
-            await asyncio.gather(*self.running_tasks.values(), return_exceptions=True)
+                self._set_status(self.tasks[task_id], "cancelled")
+            
+            # Wait for the cancellations to land without collecting results
+            await asyncio.wait(runners)
+        
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
         
         # Save final state
-        self.save_tasks()
+        await self.save_tasks()
+        self._writer.shutdown(wait=True)
+        self._journal.close()
         logger.info("Task scheduler shutdown complete")
 
 
@@ -365,16 +712,16 @@ async def example_task_handler(task: Task) -> Dict[str, Any]:
     task_type = task.task_type
     params = task.params
     
-    logger.info(f"Processing task {task.task_id} of type {task_type} with params: {params}")
+    logger.info("Processing task %s of type %s with params: %s", task.task_id, task_type, params)
     
     # Simulate work
     await asyncio.sleep(2)
     
     return {"status": "success", "message": f"Task {task.task_id} processed successfully"}
 
-async def main():
+async def main(pretty: bool = False):
     # Create the scheduler
-    scheduler = TaskScheduler(max_concurrent_tasks=5, storage_path="tasks.json")
+    scheduler = TaskScheduler(max_concurrent_tasks=5, storage_path="tasks.json", pretty=pretty)
     
     # Register handlers
     scheduler.register_handler("web_scraping", example_task_handler)
@@ -411,4 +758,11 @@ async def main():
         await scheduler.shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    
+    # Pass --pretty to write an indented, human-readable tasks.json
+    asyncio.run(main(pretty="--pretty" in sys.argv[1:]))
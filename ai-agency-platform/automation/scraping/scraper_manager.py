@@ -1,15 +1,25 @@
 import asyncio
+import codecs
 import logging
 import os
-import json
 import time
 import uuid
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Set, Tuple, Union
 from datetime import datetime
 import importlib.util
 import sys
 import random
 import traceback
+import csv
+from dataclasses import dataclass
+import itertools
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import urljoin, urlsplit
+
+import orjson
 
 # Configure logging
 logging.basicConfig(
@@ -18,85 +28,168 @@ logging.basicConfig(
 )
 logger = logging.getLogger("scraper-manager")
 
-class ScraperConfig:
-    """Configuration for a web scraper."""
+# The encoding named by a page's XML declaration or <meta> tag
+_ENCODING_DECLARATION_RE = re.compile(
+    rb'<\?xml[^>]*encoding=["\']?([\w.:-]+)|<meta[^>]*charset=["\']?([\w.:-]+)', re.IGNORECASE
+)
+
+class _RateLimiter:
+    """Spaces requests out to at most `rate` per second across coroutines."""
     
-    def __init__(
-        self,
-        name: str,
-        scraper_type: str = "scrapy",  # scrapy, selenium, beautifulsoup
-        target_urls: List[str] = None,
-        selectors: Dict[str, str] = None,
-        pagination: Dict[str, Any] = None,
-        proxy_settings: Dict[str, Any] = None,
-        user_agents: List[str] = None,
-        rate_limit: float = 1.0,  # requests per second
-        max_pages: int = 10,
-        timeout: int = 30,
-        retry_count: int = 3,
-        headers: Dict[str, str] = None,
-        cookies: Dict[str, str] = None,
-        javascript_enabled: bool = False,
-        wait_for_selectors: List[str] = None,
-        custom_script_path: Optional[str] = None,
-        output_format: str = "json",  # json, csv, xml
-        extra_settings: Dict[str, Any] = None
-    ):
-        self.name = name
-        self.scraper_type = scraper_type
-        self.target_urls = target_urls or []
-        self.selectors = selectors or {}
-        self.pagination = pagination or {}
-        self.proxy_settings = proxy_settings or {}
-        self.user_agents = user_agents or []
-        self.rate_limit = rate_limit
-        self.max_pages = max_pages
-        self.timeout = timeout
-        self.retry_count = retry_count
-        self.headers = headers or {}
-        self.cookies = cookies or {}
-        self.javascript_enabled = javascript_enabled
-        self.wait_for_selectors = wait_for_selectors or []
-        self.custom_script_path = custom_script_path
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+    
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class _ResultWriter:
+    """Streams a task's page results to its output file as they are scraped.
+    
+    Not thread-safe; the manager drives it from its single results writer thread.
+    """
+    
+    def __init__(self, path: str, output_format: str, fieldnames: List[str]):
+        self.path = path
         self.output_format = output_format
-        self.extra_settings = extra_settings or {}
+        self.fieldnames = fieldnames
+        self.pages = 0
+        self.items = 0
+        self._file = None
+        self._csv = None
         
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the config to a dictionary."""
+        if output_format in ('json', 'jsonl'):
+            self._file = open(path, 'wb')
+            if output_format == 'json':
+                self._file.write(b'[')
+        elif output_format == 'csv':
+            # Columns are the configured selectors, so rows stream out without a first pass
+            self._file = open(path, 'w', newline='')
+            self._csv = csv.writer(self._file)
+            if fieldnames:
+                self._csv.writerow(fieldnames)
+    
+    def write(self, page: Dict[str, Any]):
+        if self.output_format == 'json':
+            self._file.write(orjson.dumps(page) if not self.pages else b',' + orjson.dumps(page))
+        elif self.output_format == 'jsonl':
+            self._file.write(orjson.dumps(page, option=orjson.OPT_APPEND_NEWLINE))
+        elif self._csv is not None:
+            self._csv.writerow([page.get(key) for key in self.fieldnames])
+        self.pages += 1
+        self.items += len(page)
+    
+    def write_all(self, pages: List[Dict[str, Any]]):
+        for page in pages:
+            self.write(page)
+    
+    def close(self):
+        if self._file is None:
+            return
+        if self.output_format == 'json':
+            self._file.write(b']\n')
+        self._file.close()
+        self._file = None
+    
+    def summary(self) -> Dict[str, Any]:
         return {
-            "name": self.name,
-            "scraper_type": self.scraper_type,
-            "target_urls": self.target_urls,
-            "selectors": self.selectors,
-            "pagination": self.pagination,
-            "proxy_settings": self.proxy_settings,
-            "user_agents": self.user_agents,
-            "rate_limit": self.rate_limit,
-            "max_pages": self.max_pages,
-            "timeout": self.timeout,
-            "retry_count": self.retry_count,
-            "headers": self.headers,
-            "cookies": self.cookies,
-            "javascript_enabled": self.javascript_enabled,
-            "wait_for_selectors": self.wait_for_selectors,
-            "custom_script_path": self.custom_script_path,
-            "output_format": self.output_format,
-            "extra_settings": self.extra_settings
+            "result_path": self.path,
+            "item_count": self.pages,
+            "stats": {
+                "pages_scraped": self.pages,
+                "items_scraped": self.items
+            }
         }
+
+@dataclass(slots=True)
+class ScraperConfig:
+    """Configuration for a web scraper."""
+    
+    name: str
+    scraper_type: str = "scrapy"  # scrapy, selenium, playwright, beautifulsoup
+    target_urls: List[str] = None
+    selectors: Dict[str, str] = None
+    pagination: Dict[str, Any] = None
+    proxy_settings: Dict[str, Any] = None
+    user_agents: List[str] = None
+    rate_limit: float = 1.0  # requests per second
+    max_pages: int = 10
+    timeout: int = 30
+    retry_count: int = 3
+    headers: Dict[str, str] = None
+    cookies: Dict[str, str] = None
+    javascript_enabled: bool = False
+    wait_for_selectors: List[str] = None
+    custom_script_path: Optional[str] = None
+    output_format: str = "json"  # json, jsonl, csv, xml
+    extra_settings: Dict[str, Any] = None
+    image_urls_selector: Optional[str] = None  # Scrapy only, with extra_settings['download_images']
+    
+    def __post_init__(self):
+        self.target_urls = self.target_urls or []
+        self.selectors = self.selectors or {}
+        self.pagination = self.pagination or {}
+        self.proxy_settings = self.proxy_settings or {}
+        self.user_agents = self.user_agents or []
+        self.headers = self.headers or {}
+        self.cookies = self.cookies or {}
+        self.wait_for_selectors = self.wait_for_selectors or []
+        self.extra_settings = self.extra_settings or {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the config to a dictionary."""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ScraperConfig':
         """Create a ScraperConfig from a dictionary."""
         return cls(**data)
+    
+    def compile_extractors(self) -> Dict[str, Tuple[str, Any]]:
+        """Compile each selector once into an lxml XPath or CSS evaluator."""
+        from lxml.etree import XPath
+        from lxml.cssselect import CSSSelector
+        
+        return {
+            key: ('xpath', XPath(selector)) if selector.startswith('//') else ('css', CSSSelector(selector))
+            for key, selector in self.selectors.items()
+        }
+
+def _datetime_to_ns(value: datetime) -> int:
+    """Convert a datetime to integer nanoseconds since the epoch."""
+    return round(value.timestamp() * 1_000_000) * 1000
+
+def _ns_property(ns_attr: str) -> property:
+    """A datetime view of an integer nanosecond timestamp attribute.
+    
+    Accepts a datetime, nanoseconds or None on assignment.
+    """
+    def getter(self) -> Optional[datetime]:
+        ns = getattr(self, ns_attr)
+        return datetime.fromtimestamp(ns / 1e9) if ns is not None else None
+    
+    def setter(self, value):
+        setattr(self, ns_attr, _datetime_to_ns(value) if isinstance(value, datetime) else value)
+    
+    return property(getter, setter)
 
 class ScrapingTask:
     """A task for scraping data from websites."""
     
+    __slots__ = (
+        "task_id", "config", "created_at_ns", "status", "start_time_ns",
+        "end_time_ns", "result_path", "error", "stats", "done_event"
+    )
+    
     def __init__(
         self,
         task_id: str,
         config: ScraperConfig,
-        created_at: datetime = None,
+        created_at: Union[datetime, int] = None,
         status: str = "pending",  # pending, running, completed, failed
         result_path: Optional[str] = None,
         error: Optional[str] = None,
@@ -104,23 +197,46 @@ class ScrapingTask:
     ):
         self.task_id = task_id
         self.config = config
-        self.created_at = created_at or datetime.now()
+        # Timestamps are kept as time.time_ns() ints; datetimes are built only on access
+        self.created_at = created_at or time.time_ns()
         self.status = status
-        self.start_time: Optional[datetime] = None
-        self.end_time: Optional[datetime] = None
+        self.start_time_ns: Optional[int] = None
+        self.end_time_ns: Optional[int] = None
         self.result_path = result_path
         self.error = error
         self.stats = stats or {}
+        # Set once the task reaches a final state, so callers can wait instead of polling
+        self.done_event = asyncio.Event()
+        if status not in ("pending", "running"):
+            self.done_event.set()
+    
+    created_at = _ns_property("created_at_ns")
+    start_time = _ns_property("start_time_ns")
+    end_time = _ns_property("end_time_ns")
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the task to a dictionary."""
         return {
             "task_id": self.task_id,
             "config": self.config.to_dict(),
-            "created_at": self.created_at.isoformat(),
+            "created_at_ns": self.created_at_ns,
+            "status": self.status,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "result_path": self.result_path,
+            "error": self.error,
+            "stats": self.stats
+        }
+    
+    def to_record(self) -> Dict[str, Any]:
+        """Like to_dict(), but leaves the config for orjson to serialize natively."""
+        return {
+            "task_id": self.task_id,
+            "config": self.config,
+            "created_at_ns": self.created_at_ns,
             "status": self.status,
-            "start_time": self.start_time.isoformat() if self.start_time else None,
-            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
             "result_path": self.result_path,
             "error": self.error,
             "stats": self.stats
@@ -128,36 +244,55 @@ class ScrapingTask:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ScrapingTask':
-        """Create a ScrapingTask from a dictionary."""
+        """Create a ScrapingTask from a dictionary.
+        
+        Accepts both nanosecond timestamps and the older ISO-format strings.
+        """
+        def timestamp(name: str) -> Optional[int]:
+            if f"{name}_ns" in data:
+                return data[f"{name}_ns"]
+            if data.get(name):
+                return _datetime_to_ns(datetime.fromisoformat(data[name]))
+            return None
+        
         config = ScraperConfig.from_dict(data["config"])
         task = cls(
             task_id=data["task_id"],
             config=config,
-            created_at=datetime.fromisoformat(data["created_at"]),
+            created_at=timestamp("created_at"),
             status=data["status"],
             result_path=data["result_path"],
             error=data["error"],
             stats=data["stats"]
         )
+        task.start_time_ns = timestamp("start_time")
+        task.end_time_ns = timestamp("end_time")
         
-        if data.get("start_time"):
-            task.start_time = datetime.fromisoformat(data["start_time"])
-        
-        if data.get("end_time"):
-            task.end_time = datetime.fromisoformat(data["end_time"])
-            
         return task
 
 class ScraperManager:
     """Manager for web scraping operations."""
     
+    # scraper_type -> name of the coroutine method that runs it; subclasses can
+    # register extra types by extending this mapping
+    SCRAPER_DISPATCH = {
+        'scrapy': '_run_scrapy_scraper',
+        'selenium': '_run_selenium_scraper',
+        'playwright': '_run_playwright_scraper',
+        'beautifulsoup': '_run_beautifulsoup_scraper',
+        'custom': '_run_custom_scraper',
+    }
+    
     def __init__(
         self,
         base_dir: str = None,
         output_dir: str = "scraping_results",
         max_concurrent_tasks: int = 5,
         proxy_rotation_enabled: bool = True,
-        default_user_agents: List[str] = None
+        default_user_agents: List[str] = None,
+        driver_pool_size: int = 2,
+        state_flush_interval: float = 0.05,
+        state_log_compact_bytes: int = 4 * 1024 * 1024
     ):
         self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
         self.output_dir = os.path.join(self.base_dir, output_dir)
@@ -175,17 +310,171 @@ class ScraperManager:
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # Task states are appended to a log by a background writer
+        self.state_dir = os.path.join(self.base_dir, "task_states")
+        self.state_log_path = os.path.join(self.state_dir, "task_states.jsonl")
+        self.state_flush_interval = state_flush_interval
+        # The log is rewritten with one line per task once it outgrows both this
+        # and twice its size after the last rewrite
+        self.state_log_compact_bytes = state_log_compact_bytes
+        self._state_log_compacted_size = 0
+        self._state_queue: Optional[asyncio.Queue] = None
+        self._state_writer_task: Optional[asyncio.Task] = None
+        
         # Initialize available proxies (just placeholders - in production, use actual proxies)
         self.available_proxies = [
             {"http": "http://proxy1.example.com:8080", "https": "https://proxy1.example.com:8080"},
             {"http": "http://proxy2.example.com:8080", "https": "https://proxy2.example.com:8080"}
         ]
+        
+        # Round-robin over the proxies; failing ones sit out an exponential backoff
+        self._proxy_cycle = itertools.cycle(self.available_proxies)
+        self._proxy_fail_until: Dict[str, float] = {}
+        self._proxy_failures: Dict[str, int] = {}
+        
+        # Connection pool shared by the BeautifulSoup scraper's per-task sessions,
+        # created on first use
+        self._http_connector = None
+        
+        # lxml parsers are reusable but not thread-safe, so each parse thread keeps its own
+        self._parser_local = threading.local()
+        
+        # Reusable Selenium drivers shared across tasks, idle ones keyed by proxy
+        self.driver_pool_size = driver_pool_size
+        self._driver_slots = asyncio.Semaphore(driver_pool_size)
+        self._idle_drivers: Dict[Optional[str], List[Any]] = {}
+        self._live_drivers = 0
+        self._driver_executor: Optional[ThreadPoolExecutor] = None
+        # Origins each borrowed driver has loaded, whose storage is cleared on release
+        self._driver_origins: Dict[Any, Set[str]] = {}
+        
+        # Shared Chromium for the Playwright scraper, launched on first use
+        self._playwright = None
+        self._pw_browser = None
+        self._pw_lock = asyncio.Lock()
+        
+        # Shared Scrapy runner on the asyncio reactor, created on first use
+        self._crawler_runner = None
+        
+        # Result files are encoded and written off the event loop, one at a time
+        self._results_writer: Optional[ThreadPoolExecutor] = None
+        
+        self._load_task_states()
+    
+    def _new_http_session(self):
+        """Open an aiohttp session for one task over the shared connection pool.
+        
+        Each task gets its own session, and so its own cookie jar, so cookies set
+        by one task's pages are never sent on another task's requests.
+        """
+        import aiohttp
+        if self._http_connector is None or self._http_connector.closed:
+            self._http_connector = aiohttp.TCPConnector(
+                limit=self.max_concurrent_tasks * 16,
+                limit_per_host=64,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+        return aiohttp.ClientSession(connector=self._http_connector, connector_owner=False)
+    
+    async def aclose(self):
+        """Flush task states and release resources held by the manager."""
+        if self._state_writer_task is not None:
+            self._state_queue.put_nowait(None)
+            await self._state_writer_task
+            self._state_writer_task = None
+            self._state_queue = None
+            await asyncio.to_thread(self._compact_task_states, self._task_state_lines())
+        
+        if self._http_connector is not None:
+            await self._http_connector.close()
+            self._http_connector = None
+        
+        for idle in self._idle_drivers.values():
+            while idle:
+                self._live_drivers -= 1
+                await self._run_in_driver_thread(idle.pop().quit)
+        if self._driver_executor is not None:
+            self._driver_executor.shutdown(wait=True)
+            self._driver_executor = None
+        
+        if self._results_writer is not None:
+            self._results_writer.shutdown(wait=True)
+            self._results_writer = None
+        
+        if self._crawler_runner is not None:
+            from scrapy.utils.defer import deferred_to_future
+            from twisted.internet import reactor
+            await deferred_to_future(self._crawler_runner.stop())
+            self._crawler_runner = None
+            
+            # Stopping the reactor would stop this event loop too, so only join
+            # its (non-daemon) thread pool, which would otherwise block exit
+            await asyncio.to_thread(reactor.getThreadPool().stop)
+        
+        if self._pw_browser is not None:
+            await self._pw_browser.close()
+            self._pw_browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
 
-    def _get_random_proxy(self) -> Dict[str, str]:
-        """Get a random proxy from the pool."""
+    def _get_crawler_runner(self):
+        """Get the shared Scrapy runner, creating it on first use.
+        
+        Scrapy runs on Twisted's asyncio reactor so crawls are awaited on
+        this event loop instead of blocking it in a reactor of their own.
+        """
+        if self._crawler_runner is None:
+            from scrapy.crawler import CrawlerRunner
+            from scrapy.utils.reactor import install_reactor
+            
+            reactor_path = 'twisted.internet.asyncioreactor.AsyncioSelectorReactor'
+            install_reactor(reactor_path)
+            
+            # The asyncio loop is already running, so start the reactor's
+            # machinery (thread pool, startup triggers) without running a loop
+            from twisted.internet import reactor
+            if not reactor.running:
+                reactor.startRunning(installSignalHandlers=False)
+            
+            self._crawler_runner = CrawlerRunner({
+                'TWISTED_REACTOR': reactor_path,
+                'ROBOTSTXT_OBEY': False
+            })
+        return self._crawler_runner
+    
+    def _get_next_proxy(self) -> Dict[str, str]:
+        """Get the next healthy proxy in the rotation.
+        
+        If every proxy is quarantined, the one that recovers first is used.
+        """
         if not self.available_proxies:
             return {}
-        return random.choice(self.available_proxies)
+        
+        now = time.monotonic()
+        for _ in range(len(self.available_proxies)):
+            proxy = next(self._proxy_cycle)
+            if self._proxy_fail_until.get(proxy['http'], 0.0) <= now:
+                return proxy
+        return min(self.available_proxies, key=lambda p: self._proxy_fail_until.get(p['http'], 0.0))
+    
+    def _report_proxy_failure(self, proxy: Dict[str, str], base_backoff: float = 5.0, max_backoff: float = 300.0):
+        """Quarantine a proxy after a connection failure, doubling the backoff each time."""
+        failures = self._proxy_failures.get(proxy['http'], 0) + 1
+        self._proxy_failures[proxy['http']] = failures
+        backoff = min(base_backoff * 2 ** (failures - 1), max_backoff)
+        self._proxy_fail_until[proxy['http']] = time.monotonic() + backoff
+        logger.warning(f"Proxy {proxy['http']} failed {failures} time(s); quarantined for {backoff:.0f}s")
+    
+    def _report_proxy_success(self, proxy: Dict[str, str]):
+        """Clear a proxy's failure history."""
+        if self._proxy_failures.pop(proxy['http'], None):
+            self._proxy_fail_until.pop(proxy['http'], None)
+    
+    def _result_path(self, task: ScrapingTask) -> str:
+        """Path of the file a task's results are written to."""
+        return os.path.join(self.output_dir, f"{task.task_id}.{task.config.output_format}")
     
     def _get_random_user_agent(self, config: ScraperConfig) -> str:
         """Get a random user agent."""
@@ -196,7 +485,7 @@ class ScraperManager:
     
     async def create_task(self, config: ScraperConfig) -> str:
         """Create a new scraping task."""
-        task_id = str(uuid.uuid4())
+        task_id = uuid.uuid4().hex
         scraping_task = ScrapingTask(task_id=task_id, config=config)
         self.task_history[task_id] = scraping_task
         
@@ -223,7 +512,7 @@ class ScraperManager:
         
         # Update task status
         task.status = "running"
-        task.start_time = datetime.now()
+        task.start_time_ns = time.time_ns()
         self._save_task_state(task)
         
         # Start task
@@ -249,8 +538,9 @@ class ScraperManager:
         # Update task status
         task = self.task_history[task_id]
         task.status = "cancelled"
-        task.end_time = datetime.now()
+        task.end_time_ns = time.time_ns()
         self._save_task_state(task)
+        task.done_event.set()
         
         # Remove from running tasks
         del self.running_tasks[task_id]
@@ -271,42 +561,169 @@ class ScraperManager:
         return [task for task in self.task_history.values() if task.status == status]
     
     def _save_task_state(self, task: ScrapingTask):
-        """Save task state to disk."""
-        state_dir = os.path.join(self.base_dir, "task_states")
-        os.makedirs(state_dir, exist_ok=True)
+        """Queue the task's state for the background state writer.
+        
+        Never touches the disk itself, so it is safe to call from the event loop
+        (including _run_scraper's finally block); the writer does the I/O in a worker thread.
+        """
+        if self._state_writer_task is None:
+            self._state_queue = asyncio.Queue()
+            self._state_writer_task = asyncio.create_task(self._state_writer())
+        self._state_queue.put_nowait(task)
+    
+    async def _state_writer(self):
+        """Append queued task states to the state log, coalescing bursts per task."""
+        queue = self._state_queue
+        stopping = False
+        while not stopping:
+            task = await queue.get()
+            if task is None:
+                break
+            
+            # Let a burst of transitions accumulate, then write each task's latest state once
+            await asyncio.sleep(self.state_flush_interval)
+            pending = {task.task_id: task}
+            while not queue.empty():
+                task = queue.get_nowait()
+                if task is None:
+                    stopping = True
+                else:
+                    pending[task.task_id] = task
+            
+            try:
+                lines = self._encode_task_states(pending.values())
+                if not lines:
+                    continue
+                log_size = await asyncio.to_thread(self._append_task_states, lines)
+                if log_size > max(self.state_log_compact_bytes, 2 * self._state_log_compacted_size):
+                    await asyncio.to_thread(self._compact_task_states, self._task_state_lines())
+            except Exception as e:
+                logger.error(f"Failed to write task states: {e}")
+    
+    def _task_state_lines(self) -> List[bytes]:
+        """Serialize every task's current state.
+        
+        Runs on the event loop, where tasks are mutated, so the worker thread that
+        writes the lines never reads task_history while it changes.
+        """
+        return self._encode_task_states(self.task_history.values())
+    
+    def _encode_task_states(self, tasks) -> List[bytes]:
+        """Serialize task states one by one, so one bad value can't stop the others.
         
-        state_path = os.path.join(state_dir, f"{task.task_id}.json")
-        with open(state_path, 'w') as f:
-            json.dump(task.to_dict(), f, indent=2)
+        Values orjson can't encode, e.g. in config.extra_settings, are written as
+        their str(); a task that still can't be encoded is logged and skipped.
+        """
+        lines = []
+        for task in tasks:
+            record = task.to_record()
+            try:
+                lines.append(orjson.dumps(record))
+            except TypeError:
+                try:
+                    lines.append(orjson.dumps(record, default=str))
+                    logger.warning(f"Stored non-JSON values of task {task.task_id} as strings")
+                except TypeError as e:
+                    logger.error(f"Failed to encode state of task {task.task_id}: {e}")
+        return lines
+    
+    def _append_task_states(self, lines: List[bytes]) -> int:
+        """Append serialized task states to the state log (runs in a worker thread).
+        
+        Returns the size of the log after the write.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self.state_log_path, 'ab') as f:
+            f.write(b"\n".join(lines) + b"\n")
+            return f.tell()
+    
+    def _compact_task_states(self, lines: List[bytes]):
+        """Replace the state log with the given task states (runs in a worker thread)."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        data = b"".join(line + b"\n" for line in lines)
+        tmp_path = f"{self.state_log_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.state_log_path)
+        self._state_log_compacted_size = len(data)
     
     def _load_task_states(self):
         """Load task states from disk."""
-        state_dir = os.path.join(self.base_dir, "task_states")
-        if not os.path.exists(state_dir):
+        try:
+            with os.scandir(self.state_dir) as it:
+                entries = [entry for entry in it if entry.name.endswith(".json") and entry.is_file()]
+        except FileNotFoundError:
             return
         
-        for filename in os.listdir(state_dir):
-            if filename.endswith(".json"):
-                state_path = os.path.join(state_dir, filename)
-                try:
-                    with open(state_path, 'r') as f:
-                        task_data = json.load(f)
-                        task = ScrapingTask.from_dict(task_data)
+        # Per-task files written by older versions; reads overlap across threads
+        def read_state(entry: os.DirEntry):
+            with open(entry.path, 'rb') as f:
+                return orjson.loads(f.read())
+        
+        if entries:
+            with ThreadPoolExecutor(max_workers=min(32, len(entries))) as pool:
+                futures = [pool.submit(read_state, entry) for entry in entries]
+                for entry, future in zip(entries, futures):
+                    try:
+                        task = ScrapingTask.from_dict(future.result())
                         self.task_history[task.task_id] = task
+                    except Exception as e:
+                        logger.error(f"Failed to load task state from {entry.name}: {e}")
+        
+        # The last record for a task in the log is its current state
+        torn = False
+        if os.path.exists(self.state_log_path):
+            with open(self.state_log_path, 'rb') as f:
+                data = f.read()
+            # A last line cut short by an interrupted write has no newline
+            torn = bool(data) and not data.endswith(b"\n")
+            for line_number, line in enumerate(data.splitlines(), 1):
+                try:
+                    task = ScrapingTask.from_dict(orjson.loads(line))
+                    self.task_history[task.task_id] = task
                 except Exception as e:
-                    logger.error(f"Failed to load task state from {filename}: {e}")
+                    logger.error(f"Failed to load task state from line {line_number} of the state log: {e}")
+            self._state_log_compacted_size = len(data)
+        
+        # Tasks a previous process left running will never finish, so record them
+        # as failed instead of reviving them; pending ones can still be started
+        interrupted = [task for task in self.task_history.values() if task.status == "running"]
+        for task in interrupted:
+            task.status = "failed"
+            task.error = "Interrupted by a restart before completion"
+        
+        # Persist the interrupted states, and drop a torn line before anything is appended to it
+        if interrupted or torn:
+            try:
+                self._compact_task_states(self._task_state_lines())
+            except Exception as e:
+                logger.error(f"Failed to rewrite the state log: {e}")
     
     async def _run_scrapy_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
         """Run a Scrapy scraper."""
         try:
-            from scrapy.crawler import CrawlerProcess
-            from scrapy import Spider, Request
-            from scrapy.selector import Selector
-            import scrapy.settings
-            from twisted.internet import reactor
+            from scrapy import Spider
+            from scrapy.utils.defer import deferred_to_future
             
+            runner = self._get_crawler_runner()
             config = task.config
             results = []
+            result_path = self._result_path(task)
+            
+            # Resolve each selector's kind once rather than on every page
+            def _kind(selector: str) -> str:
+                return 'xpath' if selector.startswith('//') else 'css'
+            
+            extractors = [(key, _kind(selector), selector) for key, selector in config.selectors.items()]
+            next_page_extractor = None
+            if 'next_page' in config.pagination:
+                selector = config.pagination['next_page']
+                next_page_extractor = (_kind(selector), selector)
+            
+            download_images = bool(config.extra_settings.get('download_images')) and bool(config.image_urls_selector)
+            image_urls_extractor = None
+            if download_images:
+                image_urls_extractor = (_kind(config.image_urls_selector), config.image_urls_selector)
             
             class DynamicSpider(Spider):
                 name = config.name
@@ -319,11 +736,18 @@ class ScraperManager:
                     'RETRY_TIMES': config.retry_count,
                     'ROBOTSTXT_OBEY': False,
                     'DOWNLOAD_TIMEOUT': config.timeout,
-                    'ITEM_PIPELINES': {'scrapy.pipelines.images.ImagesPipeline': 1},
                     'FEED_FORMAT': config.output_format,
-                    'FEED_URI': f"{self.output_dir}/{task.task_id}.{config.output_format}"
+                    'FEED_URI': result_path
                 }
                 
+                # The images pipeline downloads and thumbnails every item's
+                # image_urls, so only enable it when images are asked for
+                if download_images:
+                    custom_settings['ITEM_PIPELINES'] = {'scrapy.pipelines.images.ImagesPipeline': 1}
+                    custom_settings['IMAGES_STORE'] = config.extra_settings.get(
+                        'images_store', os.path.join(self.output_dir, f"{task.task_id}_images")
+                    )
+                
                 if self.proxy_rotation_enabled and config.proxy_settings.get('enabled', False):
                     custom_settings['DOWNLOADER_MIDDLEWARES'] = {
                         'scrapy.downloadermiddlewares.httpproxy.HttpProxyMiddleware': 110,
@@ -332,55 +756,51 @@ class ScraperManager:
                     custom_settings['PROXY_LIST'] = config.proxy_settings.get('proxy_list', [])
                 
                 def parse(self, response):
-                    selectors = config.selectors
                     items = {}
+                    strip = str.strip
                     
-                    # Extract data based on selectors
-                    for key, selector in selectors.items():
-                        if selector.startswith('//'):  # XPath
-                            items[key] = response.xpath(selector).getall()
-                        else:  # CSS
-                            items[key] = response.css(selector).getall()
-                    
-                    # Clean up extracted data (strip whitespace, etc.)
-                    for key in items:
-                        if isinstance(items[key], list):
-                            items[key] = [i.strip() for i in items[key] if i.strip()]
-                        elif isinstance(items[key], str):
-                            items[key] = items[key].strip()
+                    # Extract data based on selectors, stripping whitespace and
+                    # dropping empty strings in the same pass
+                    for key, kind, selector in extractors:
+                        if kind == 'xpath':
+                            matches = response.xpath(selector).getall()
+                        else:
+                            matches = response.css(selector).getall()
+                        items[key] = [s for raw in matches if (s := strip(raw))]
                     
                     results.append(items)
                     
+                    # Hand the page to the images pipeline with absolute image URLs
+                    if image_urls_extractor:
+                        kind, selector = image_urls_extractor
+                        if kind == 'xpath':
+                            image_urls = response.xpath(selector).getall()
+                        else:
+                            image_urls = response.css(selector).getall()
+                        yield {**items, 'image_urls': [response.urljoin(u) for u in image_urls if u.strip()]}
+                    
                     # Handle pagination if configured
-                    if 'next_page' in config.pagination and len(results) < config.max_pages:
-                        next_page = None
-                        selector = config.pagination['next_page']
-                        
-                        if selector.startswith('//'):  # XPath
-                            next_pages = response.xpath(selector).getall()
-                            if next_pages:
-                                next_page = next_pages[0]
-                        else:  # CSS
-                            next_pages = response.css(selector).getall()
-                            if next_pages:
-                                next_page = next_pages[0]
+                    if next_page_extractor and len(results) < config.max_pages:
+                        kind, selector = next_page_extractor
+                        if kind == 'xpath':
+                            next_page = response.xpath(selector).get()
+                        else:
+                            next_page = response.css(selector).get()
                         
                         if next_page:
                             yield response.follow(next_page, self.parse)
             
-            # Initialize CrawlerProcess
-            settings = scrapy.settings.Settings()
-            settings.setdict(DynamicSpider.custom_settings)
-            
-            process = CrawlerProcess(settings)
-            process.crawl(DynamicSpider)
-            
-            # Run the spider
-            process.start()
+            # Run the spider on the shared runner; its custom_settings carry the
+            # task-specific settings on top of the runner's base settings
+            crawler = runner.create_crawler(DynamicSpider)
+            try:
+                await deferred_to_future(runner.crawl(crawler))
+            except asyncio.CancelledError:
+                if crawler.crawling:
+                    await deferred_to_future(crawler.stop())
+                raise
             
             # Results are saved to the file specified in FEED_URI
-            result_path = f"{self.output_dir}/{task.task_id}.{config.output_format}"
-            
             return {
                 "result_path": result_path,
                 "item_count": len(results),
@@ -395,282 +815,533 @@ class ScraperManager:
             logger.error(traceback.format_exc())
             raise
     
-    async def _run_selenium_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
-        """Run a Selenium scraper."""
+    def _new_driver(self, proxy_server: Optional[str]):
+        """Launch a headless Chrome driver (runs in a driver thread)."""
         from selenium import webdriver
         from selenium.webdriver.chrome.options import Options
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        from selenium.common.exceptions import TimeoutException, WebDriverException
-        
-        config = task.config
-        results = []
         
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         
-        # Set user agent
-        chrome_options.add_argument(f"user-agent={self._get_random_user_agent(config)}")
+        # The proxy is fixed at launch, so pooled drivers are keyed by it
+        if proxy_server:
+            chrome_options.add_argument(f"--proxy-server={proxy_server}")
         
-        # Configure proxy if enabled
-        if self.proxy_rotation_enabled and config.proxy_settings.get('enabled', False):
-            proxy = self._get_random_proxy()
-            if proxy:
-                chrome_options.add_argument(f"--proxy-server={proxy['http']}")
+        return webdriver.Chrome(options=chrome_options)
+    
+    def _run_in_driver_thread(self, func, *args):
+        """Run a blocking WebDriver call on the driver thread pool."""
+        if self._driver_executor is None:
+            self._driver_executor = ThreadPoolExecutor(
+                max_workers=self.driver_pool_size, thread_name_prefix="scraper-webdriver"
+            )
+        return asyncio.get_running_loop().run_in_executor(self._driver_executor, func, *args)
+    
+    @asynccontextmanager
+    async def _acquire_driver(self, proxy_server: Optional[str]):
+        """Borrow a pooled WebDriver, launching one if none is idle."""
+        async with self._driver_slots:
+            idle = self._idle_drivers.setdefault(proxy_server, [])
+            if idle:
+                driver = idle.pop()
+            else:
+                # Make room by retiring an idle driver bound to another proxy
+                if self._live_drivers >= self.driver_pool_size:
+                    for other in self._idle_drivers.values():
+                        if other:
+                            self._live_drivers -= 1
+                            await self._run_in_driver_thread(other.pop().quit)
+                            break
+                driver = await self._run_in_driver_thread(self._new_driver, proxy_server)
+                self._live_drivers += 1
+            
+            try:
+                yield driver
+            except BaseException:
+                # Don't hand a driver in an unknown state to the next task
+                self._live_drivers -= 1
+                self._driver_origins.pop(driver, None)
+                await self._run_in_driver_thread(driver.quit)
+                raise
+            
+            # Reset per-task state instead of quitting; a driver that can't be
+            # reset is retired so nothing carries over to the next task
+            try:
+                await self._run_in_driver_thread(self._reset_driver, driver)
+            except Exception as e:
+                logger.warning(f"Retiring WebDriver that could not be reset: {e}")
+                self._live_drivers -= 1
+                await self._run_in_driver_thread(driver.quit)
+                return
+            idle.append(driver)
+    
+    def _record_driver_origin(self, driver):
+        """Remember the origin of the driver's current page (runs in a driver thread)."""
+        parts = urlsplit(driver.current_url)
+        if parts.scheme in ('http', 'https'):
+            self._driver_origins.setdefault(driver, set()).add(f"{parts.scheme}://{parts.netloc}")
+    
+    def _reset_driver(self, driver):
+        """Clear a driver's browsing state before it returns to the pool (runs in a driver thread).
         
-        # Add headers and cookies in JavaScript
-        custom_headers = json.dumps(config.headers)
-        custom_cookies = json.dumps(config.cookies)
+        Cookies and cache are cleared browser-wide; local storage, IndexedDB and
+        service workers for every origin the task loaded. The task's tab is
+        swapped for a fresh about:blank tab, which also drops its session storage.
+        """
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        for origin in self._driver_origins.pop(driver, ()):
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        
+        used_tab = driver.current_window_handle
+        driver.switch_to.new_window('tab')
+        fresh_tab = driver.current_window_handle
+        driver.switch_to.window(used_tab)
+        driver.close()
+        driver.switch_to.window(fresh_tab)
+    
+    @staticmethod
+    def _selenium_locator(selector: str) -> Tuple[str, str]:
+        """Split a selector into a WebDriver (By, value) locator."""
+        from selenium.webdriver.common.by import By
+        return (By.XPATH if selector.startswith('//') else By.CSS_SELECTOR, selector)
+    
+    @staticmethod
+    def _selenium_wait_for(wait, wait_locators: List[Tuple[str, str]]):
+        """Wait for each configured selector to be present on the current page."""
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        
+        for locator in wait_locators:
+            try:
+                wait.until(EC.presence_of_element_located(locator))
+            except TimeoutException:
+                logger.warning(f"Timeout waiting for selector: {locator[1]}")
+    
+    @staticmethod
+    def _selenium_extract(driver, extractors: List[Tuple[str, str, str]]) -> Dict[str, Any]:
+        """Extract the current page's results with pre-split locators."""
+        page_results = {}
+        for key, by, selector in extractors:
+            try:
+                page_results[key] = [el.text for el in driver.find_elements(by, selector)]
+            except Exception as e:
+                logger.warning(f"Error extracting {key} with selector {selector}: {e}")
+                page_results[key] = []
+        return page_results
+    
+    def _selenium_scrape_url(
+        self,
+        driver,
+        url: str,
+        config: ScraperConfig,
+        user_agent: str,
+        extractors: List[Tuple[str, str, str]]
+    ) -> List[Dict[str, Any]]:
+        """Scrape one URL and its pagination with a pooled driver (runs in a driver thread)."""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import WebDriverException
+        
+        results = []
+        wait = WebDriverWait(driver, config.timeout)
+        wait_locators = [(By.CSS_SELECTOR, selector) for selector in config.wait_for_selectors]
+        
+        # Apply the task's user agent, headers and cookies to the pooled browser
+        # through CDP; headers are always set and cookies always cleared first,
+        # so a previous task's don't leak through
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {'userAgent': user_agent})
+        driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {'headers': config.headers})
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.set_page_load_timeout(config.timeout)
         
         try:
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.set_page_load_timeout(config.timeout)
+            # Set cookies before the first request so it already carries them
+            if config.cookies:
+                driver.execute_cdp_cmd('Network.setCookies', {'cookies': [
+                    {'name': name, 'value': value, 'url': url}
+                    for name, value in config.cookies.items()
+                ]})
+            
+            driver.get(url)
+            self._record_driver_origin(driver)
+            self._selenium_wait_for(wait, wait_locators)
+            results.append(self._selenium_extract(driver, extractors))
+            
+            # Handle pagination if configured
+            next_page_locator = None
+            if 'next_page' in config.pagination:
+                next_page_locator = self._selenium_locator(config.pagination['next_page'])
             
-            for url in config.target_urls:
+            while len(results) < config.max_pages and next_page_locator:
                 try:
-                    driver.get(url)
+                    next_buttons = driver.find_elements(*next_page_locator)
                     
-                    # Set cookies
-                    if config.cookies:
-                        driver.execute_script(f"""
-                            const cookies = {custom_cookies};
-                            for (const [name, value] of Object.entries(cookies)) {{
-                                document.cookie = `${{name}}=${{value}}`;
-                            }}
-                        """)
-                    
-                    # Wait for selectors if specified
-                    if config.wait_for_selectors:
-                        for selector in config.wait_for_selectors:
-                            try:
-                                WebDriverWait(driver, config.timeout).until(
-                                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                                )
-                            except TimeoutException:
-                                logger.warning(f"Timeout waiting for selector: {selector}")
+                    if not next_buttons or not next_buttons[0].is_displayed() or not next_buttons[0].is_enabled():
+                        break
                     
-                    # Extract data based on selectors
-                    page_results = {}
+                    next_buttons[0].click()
                     
-                    for key, selector in config.selectors.items():
-                        try:
-                            if selector.startswith('//'):  # XPath
-                                elements = driver.find_elements(By.XPATH, selector)
-                                page_results[key] = [el.text for el in elements]
-                            else:  # CSS
-                                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                page_results[key] = [el.text for el in elements]
-                        except Exception as e:
-                            logger.warning(f"Error extracting {key} with selector {selector}: {e}")
-                            page_results[key] = []
+                    # Wait for page to load
+                    time.sleep(1.0 / config.rate_limit)
                     
-                    results.append(page_results)
+                    self._record_driver_origin(driver)
+                    self._selenium_wait_for(wait, wait_locators)
+                    results.append(self._selenium_extract(driver, extractors))
                     
-                    # Handle pagination if configured
-                    page_count = 1
-                    while page_count < config.max_pages and 'next_page' in config.pagination:
-                        try:
-                            selector = config.pagination['next_page']
-                            if selector.startswith('//'):  # XPath
-                                next_buttons = driver.find_elements(By.XPATH, selector)
-                            else:  # CSS
-                                next_buttons = driver.find_elements(By.CSS_SELECTOR, selector)
-                            
-                            if not next_buttons or not next_buttons[0].is_displayed() or not next_buttons[0].is_enabled():
-                                break
-                            
-                            next_buttons[0].click()
-                            
-                            # Wait for page to load
-                            await asyncio.sleep(1.0 / config.rate_limit)
-                            
-                            # Wait for selectors again
-                            if config.wait_for_selectors:
-                                for selector in config.wait_for_selectors:
-                                    try:
-                                        WebDriverWait(driver, config.timeout).until(
-                                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                                        )
-                                    except TimeoutException:
-                                        logger.warning(f"Timeout waiting for selector: {selector}")
-                            
-                            # Extract data from new page
-                            page_results = {}
-                            
-                            for key, selector in config.selectors.items():
-                                try:
-                                    if selector.startswith('//'):  # XPath
-                                        elements = driver.find_elements(By.XPATH, selector)
-                                        page_results[key] = [el.text for el in elements]
-                                    else:  # CSS
-                                        elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                        page_results[key] = [el.text for el in elements]
-                                except Exception as e:
-                                    logger.warning(f"Error extracting {key} with selector {selector}: {e}")
-                                    page_results[key] = []
-                            
-                            results.append(page_results)
-                            page_count += 1
-                            
-                        except Exception as e:
-                            logger.warning(f"Pagination error: {e}")
-                            break
-                            
-                except WebDriverException as e:
-                    logger.error(f"WebDriver error for URL {url}: {e}")
                 except Exception as e:
-                    logger.error(f"Error scraping URL {url}: {e}")
-            
-            # Save results
-            output_file = f"{self.output_dir}/{task.task_id}.{config.output_format}"
-            
-            if config.output_format == 'json':
-                with open(output_file, 'w') as f:
-                    json.dump(results, f, indent=2)
-            elif config.output_format == 'csv':
-                import csv
-                with open(output_file, 'w', newline='') as f:
-                    if results and results[0]:
-                        writer = csv.DictWriter(f, fieldnames=results[0].keys())
-                        writer.writeheader()
-                        for result in results:
-                            writer.writerow(result)
-            
-            return {
-                "result_path": output_file,
-                "item_count": len(results),
-                "stats": {
-                    "pages_scraped": len(results),
-                    "items_scraped": sum(len(page) for page in results)
-                }
-            }
+                    logger.warning(f"Pagination error: {e}")
+                    break
+                    
+        except WebDriverException as e:
+            logger.error(f"WebDriver error for URL {url}: {e}")
+        except Exception as e:
+            logger.error(f"Error scraping URL {url}: {e}")
+        
+        return results
+    
+    async def _run_selenium_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
+        """Run a Selenium scraper."""
+        config = task.config
+        
+        user_agent = self._get_random_user_agent(config)
+        
+        # Configure proxy if enabled
+        proxy_server = None
+        if self.proxy_rotation_enabled and config.proxy_settings.get('enabled', False):
+            proxy = self._get_next_proxy()
+            if proxy:
+                proxy_server = proxy['http']
+        
+        # Pre-split selectors into WebDriver locators once per task
+        extractors = [
+            (key, *self._selenium_locator(selector)) for key, selector in config.selectors.items()
+        ]
+        
+        async def scrape_url(url: str):
+            # Each URL borrows its own driver, so URLs load in parallel up to the pool size
+            async with self._acquire_driver(proxy_server) as driver:
+                pages = await self._run_in_driver_thread(
+                    self._selenium_scrape_url, driver, url, config, user_agent, extractors
+                )
             
+            # Stream each URL's pages out as soon as it finishes
+            await self._run_results_writer(writer.write_all, pages)
+        
+        writer = await self._open_result_writer(task)
+        try:
+            # A failing URL cancels its siblings instead of leaving them running orphaned
+            async with asyncio.TaskGroup() as tg:
+                for url in config.target_urls:
+                    tg.create_task(scrape_url(url))
         finally:
-            driver.quit()
+            await self._run_results_writer(writer.close)
+        
+        return writer.summary()
     
-    async def _run_beautifulsoup_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
-        """Run a BeautifulSoup scraper."""
-        import requests
-        from bs4 import BeautifulSoup
-        import time
+    async def _get_pw_browser(self):
+        """Get the shared Playwright browser, launching it on first use."""
+        async with self._pw_lock:
+            if self._pw_browser is None or not self._pw_browser.is_connected():
+                from playwright.async_api import async_playwright
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._pw_browser = await self._playwright.chromium.launch(
+                    headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"]
+                )
+        return self._pw_browser
+    
+    async def _extract_pw_page(self, page, config: ScraperConfig) -> Dict[str, Any]:
+        """Wait for the configured selectors and extract one page's results."""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+        
+        # Wait for selectors if specified
+        for selector in config.wait_for_selectors:
+            try:
+                await page.wait_for_selector(selector, timeout=config.timeout * 1000)
+            except PlaywrightTimeoutError:
+                logger.warning(f"Timeout waiting for selector: {selector}")
         
+        # Extract data based on selectors; Playwright treats '//' selectors as XPath
+        page_results = {}
+        for key, selector in config.selectors.items():
+            try:
+                page_results[key] = await page.locator(selector).all_inner_texts()
+            except Exception as e:
+                logger.warning(f"Error extracting {key} with selector {selector}: {e}")
+                page_results[key] = []
+        
+        return page_results
+    
+    async def _run_playwright_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
+        """Run a Playwright scraper."""
         config = task.config
-        results = []
+        browser = await self._get_pw_browser()
+        
+        # One lightweight context per task carries its user agent, proxy and cookies
+        context_options = {
+            "user_agent": self._get_random_user_agent(config),
+            "extra_http_headers": config.headers or None
+        }
+        if self.proxy_rotation_enabled and config.proxy_settings.get('enabled', False):
+            proxy = self._get_next_proxy()
+            if proxy:
+                context_options["proxy"] = {"server": proxy['http']}
+        
+        context = await browser.new_context(**context_options)
+        context.set_default_timeout(config.timeout * 1000)
+        
+        # Set cookies for every target origin before any page opens, so the
+        # first request to each already carries them
+        if config.cookies:
+            origins = dict.fromkeys(
+                f"{parts.scheme}://{parts.netloc}"
+                for parts in map(urlsplit, config.target_urls)
+                if parts.scheme in ("http", "https")
+            )
+            await context.add_cookies([
+                {"name": name, "value": value, "url": origin}
+                for origin in origins
+                for name, value in config.cookies.items()
+            ])
         
-        for url in config.target_urls:
+        limiter = _RateLimiter(config.rate_limit)
+        semaphore = asyncio.Semaphore(config.extra_settings.get('max_in_flight', 8))
+        
+        async def write_page(page_results: Dict[str, Any]):
+            await self._run_results_writer(writer.write, page_results)
+        
+        async def scrape_url(url: str):
+            page = await context.new_page()
             try:
-                # Configure session
-                session = requests.Session()
+                await limiter.wait()
+                await page.goto(url)
                 
-                # Set user agent
-                headers = config.headers.copy() if config.headers else {}
-                headers['User-Agent'] = self._get_random_user_agent(config)
+                await write_page(await self._extract_pw_page(page, config))
+                page_count = 1
                 
-                # Set cookies
-                if config.cookies:
-                    for name, value in config.cookies.items():
-                        session.cookies.set(name, value)
-                
-                # Configure proxy if enabled
-                if self.proxy_rotation_enabled and config.proxy_settings.get('enabled', False):
-                    proxy = self._get_random_proxy()
+                # Handle pagination if configured
+                while page_count < config.max_pages and 'next_page' in config.pagination:
+                    next_button = page.locator(config.pagination['next_page']).first
+                    if not await next_button.count() or not await next_button.is_enabled():
+                        break
+                    
+                    await limiter.wait()
+                    await next_button.click()
+                    await page.wait_for_load_state()
+                    
+                    await write_page(await self._extract_pw_page(page, config))
+                    page_count += 1
+            finally:
+                await page.close()
+        
+        async def scrape_bounded(url: str):
+            # Pages are written as they are scraped, so those before an error are kept
+            async with semaphore:
+                try:
+                    await scrape_url(url)
+                except Exception as e:
+                    logger.error(f"Error scraping URL {url}: {e}")
+        
+        writer = await self._open_result_writer(task)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for url in config.target_urls:
+                    tg.create_task(scrape_bounded(url))
+        finally:
+            await context.close()
+            await self._run_results_writer(writer.close)
+        
+        return writer.summary()
+    
+    def _run_results_writer(self, func, *args):
+        """Run a blocking results write on the single results writer thread."""
+        if self._results_writer is None:
+            self._results_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scraper-results")
+        return asyncio.get_running_loop().run_in_executor(self._results_writer, func, *args)
+    
+    async def _open_result_writer(self, task: ScrapingTask) -> _ResultWriter:
+        """Open a streaming writer for the task's results on the results writer thread."""
+        config = task.config
+        return await self._run_results_writer(
+            _ResultWriter, self._result_path(task), config.output_format, list(config.selectors)
+        )
+    
+    async def _fetch_body(
+        self, session, url: str, config: ScraperConfig, limiter: '_RateLimiter', **kwargs
+    ) -> Tuple[bytes, str]:
+        """GET a page, backing off and retrying on 429 and 5xx responses.
+        
+        Returns the raw body and the encoding to parse it with: the one in the
+        Content-Type header, else the one the page declares, else aiohttp's guess.
+        """
+        backoff = 1.0
+        for attempt in range(config.retry_count + 1):
+            await limiter.wait()
+            async with session.get(url, **kwargs) as response:
+                retryable = response.status == 429 or response.status >= 500
+                if not retryable or attempt == config.retry_count:
+                    response.raise_for_status()
+                    body = await response.read()
+                    # libxml2's HTML parser ignores an XML declaration's encoding, so
+                    # always tell it which encoding to use
+                    declared = None if response.charset else _ENCODING_DECLARATION_RE.search(body, 0, 2048)
+                    if declared:
+                        try:
+                            return body, codecs.lookup((declared[1] or declared[2]).decode('ascii')).name
+                        except LookupError:
+                            pass
+                    return body, response.get_encoding()
+                retry_after = response.headers.get('Retry-After', '')
+            
+            # Sleep outside the response context so the connection goes back to the pool
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else backoff)
+            backoff *= 2
+    
+    def _parse_soup_page(
+        self, body: bytes, encoding: str, extractors: Dict[str, Tuple[str, Any]], next_page_selector
+    ):
+        """Extract one page's results and its next-page link (runs in a worker thread).
+        
+        lxml gets the raw bytes, since it rejects str input that starts with an
+        XML declaration naming an encoding.
+        """
+        from lxml import etree
+        
+        # One parser per encoding and thread
+        parsers = getattr(self._parser_local, 'parsers', None)
+        if parsers is None:
+            parsers = self._parser_local.parsers = {}
+        parser = parsers.get(encoding)
+        if parser is None:
+            import lxml.html
+            try:
+                parser = lxml.html.HTMLParser(
+                    encoding=encoding, collect_ids=False, remove_comments=True, remove_pis=True
+                )
+            except LookupError:
+                # An encoding Python knows but libxml2 doesn't; hand lxml UTF-8 instead
+                return self._parse_soup_page(
+                    body.decode(encoding, errors='replace').encode('utf-8'), 'utf-8',
+                    extractors, next_page_selector
+                )
+            parsers[encoding] = parser
+        
+        tree = etree.fromstring(body, parser) if body.strip() else None
+        if tree is None:
+            return {key: [] for key in extractors}, None
+        
+        page_results = {}
+        
+        # Extract data with the task's precompiled selectors
+        for key, (kind, extract) in extractors.items():
+            if kind == 'xpath':
+                page_results[key] = [
+                    str(match) if isinstance(match, str) else "".join(match.itertext()).strip()
+                    for match in extract(tree)
+                ]
+            else:
+                page_results[key] = ["".join(elem.itertext()).strip() for elem in extract(tree)]
+        
+        # Find next page link
+        next_page = None
+        if next_page_selector is not None:
+            next_elements = next_page_selector(tree)
+            if next_elements:
+                if next_elements[0].tag == 'a':
+                    next_page = next_elements[0].get('href')
+                else:
+                    next_link = next_elements[0].find('.//a')
+                    if next_link is not None:
+                        next_page = next_link.get('href')
+        
+        return page_results, next_page
+    
+    async def _run_beautifulsoup_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
+        """Run a BeautifulSoup scraper."""
+        import aiohttp
+        from lxml.cssselect import CSSSelector
+        
+        config = task.config
+        
+        # Headers and cookies are the same for every request of the task
+        base_headers = {**config.headers, 'User-Agent': self._get_random_user_agent(config)}
+        cookies = config.cookies or None
+        
+        # Compile selectors once per task instead of on every page
+        extractors = config.compile_extractors()
+        next_page_selector = None
+        if 'next_page' in config.pagination:
+            next_page_selector = CSSSelector(config.pagination['next_page'])
+        timeout = aiohttp.ClientTimeout(total=config.timeout)
+        loop = asyncio.get_running_loop()
+        
+        # All URLs of the task share one request budget; the semaphore bounds
+        # how many of them are in flight at once
+        limiter = _RateLimiter(config.rate_limit)
+        semaphore = asyncio.Semaphore(config.extra_settings.get('max_in_flight', 8))
+        
+        async def scrape_url(url: str):
+            # Configure proxy if enabled
+            proxy = None
+            if self.proxy_rotation_enabled and config.proxy_settings.get('enabled', False):
+                proxy = self._get_next_proxy() or None
+            proxy_url = proxy['http'] if proxy else None
+            
+            page_url = url
+            visited = {url}
+            for _ in range(config.max_pages):
+                try:
+                    body, encoding = await self._fetch_body(
+                        session, page_url, config, limiter, headers=base_headers,
+                        cookies=cookies, proxy=proxy_url, timeout=timeout
+                    )
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
                     if proxy:
-                        session.proxies.update(proxy)
+                        self._report_proxy_failure(proxy)
+                    raise
+                if proxy:
+                    self._report_proxy_success(proxy)
                 
-                # Scrape initial page
-                response = session.get(url, headers=headers, timeout=config.timeout)
-                response.raise_for_status()
+                # Parse off the event loop so it overlaps with other fetches
+                page_results, next_page = await loop.run_in_executor(
+                    None, self._parse_soup_page, body, encoding, extractors, next_page_selector
+                )
+                await self._run_results_writer(writer.write, page_results)
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # Handle pagination if configured
+                if not next_page:
+                    break
                 
-                page_count = 0
-                while page_count < config.max_pages:
-                    page_results = {}
-                    
-                    # Extract data based on selectors
-                    for key, selector in config.selectors.items():
-                        if selector.startswith('//'):  # XPath
-                            # BeautifulSoup doesn't support XPath, so we'll use a simple conversion
-                            # This is just a basic example - in practice, use a proper XPath library
-                            if '//' in selector and '@' in selector:
-                                tag, attr = selector.split('@')
-                                tag = tag.split('/')[-1]
-                                page_results[key] = [elem.get(attr) for elem in soup.find_all(tag)]
-                            else:
-                                tag = selector.split('/')[-1]
-                                page_results[key] = [elem.text.strip() for elem in soup.find_all(tag)]
-                        else:  # CSS
-                            elements = soup.select(selector)
-                            page_results[key] = [elem.text.strip() for elem in elements]
-                    
-                    results.append(page_results)
-                    page_count += 1
-                    
-                    # Handle pagination if configured
-                    if 'next_page' in config.pagination:
-                        next_page = None
-                        selector = config.pagination['next_page']
-                        
-                        # Find next page link
-                        next_elements = soup.select(selector)
-                        if next_elements:
-                            if next_elements[0].name == 'a':
-                                next_page = next_elements[0]['href']
-                            else:
-                                next_links = next_elements[0].select('a')
-                                if next_links:
-                                    next_page = next_links[0]['href']
-                        
-                        if not next_page:
-                            break
-                        
-                        # Make absolute URL if needed
-                        if next_page.startswith('/'):
-                            from urllib.parse import urlparse
-                            parsed_url = urlparse(url)
-                            next_page = f"{parsed_url.scheme}://{parsed_url.netloc}{next_page}"
-                        
-                        # Respect rate limiting
-                        time.sleep(1.0 / config.rate_limit)
-                        
-                        # Fetch next page
-                        response = session.get(next_page, headers=headers, timeout=config.timeout)
-                        response.raise_for_status()
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                    else:
-                        break
-                        
-            except requests.RequestException as e:
-                logger.error(f"Request error for URL {url}: {e}")
-            except Exception as e:
-                logger.error(f"Error scraping URL {url}: {e}")
-        
-        # Save results
-        output_file = f"{self.output_dir}/{task.task_id}.{config.output_format}"
-        
-        if config.output_format == 'json':
-            with open(output_file, 'w') as f:
-                json.dump(results, f, indent=2)
-        elif config.output_format == 'csv':
-            import csv
-            with open(output_file, 'w', newline='') as f:
-                if results and results[0]:
-                    writer = csv.DictWriter(f, fieldnames=results[0].keys())
-                    writer.writeheader()
-                    for result in results:
-                        writer.writerow(result)
+                # Resolve relative links against the current page and stop on a cycle
+                next_page = urljoin(page_url, next_page)
+                if next_page in visited:
+                    break
+                visited.add(next_page)
+                page_url = next_page
         
-        return {
-            "result_path": output_file,
-            "item_count": len(results),
-            "stats": {
-                "pages_scraped": len(results),
-                "items_scraped": sum(len(page) for page in results)
-            }
-        }
+        async def scrape_bounded(url: str):
+            # Pages are written as they are scraped, so those before an error are kept
+            async with semaphore:
+                try:
+                    await scrape_url(url)
+                except aiohttp.ClientError as e:
+                    logger.error(f"Request error for URL {url}: {e}")
+                except Exception as e:
+                    logger.error(f"Error scraping URL {url}: {e}")
+        
+        writer = await self._open_result_writer(task)
+        try:
+            async with self._new_http_session() as session, asyncio.TaskGroup() as tg:
+                for url in config.target_urls:
+                    tg.create_task(scrape_bounded(url))
+        finally:
+            await self._run_results_writer(writer.close)
+        
+        return writer.summary()
     
     async def _run_custom_scraper(self, task: ScrapingTask) -> Dict[str, Any]:
         """Run a custom scraper script."""
@@ -698,38 +1369,33 @@ class ScraperManager:
         """Run a scraper based on the task configuration."""
         try:
             scraper_type = task.config.scraper_type.lower()
-            
-            if scraper_type == 'scrapy':
-                result = await self._run_scrapy_scraper(task)
-            elif scraper_type == 'selenium':
-                result = await self._run_selenium_scraper(task)
-            elif scraper_type == 'beautifulsoup':
-                result = await self._run_beautifulsoup_scraper(task)
-            elif scraper_type == 'custom':
-                result = await self._run_custom_scraper(task)
-            else:
+            runner_name = self.SCRAPER_DISPATCH.get(scraper_type)
+            if runner_name is None:
                 raise ValueError(f"Unsupported scraper type: {scraper_type}")
+            result = await getattr(self, runner_name)(task)
             
             # Update task with result
             task.status = "completed"
             task.result_path = result.get("result_path")
             task.stats = result.get("stats", {})
-            task.end_time = datetime.now()
+            task.end_time_ns = time.time_ns()
             
         except asyncio.CancelledError:
             # Task was cancelled
             task.status = "cancelled"
-            task.end_time = datetime.now()
+            task.end_time_ns = time.time_ns()
             raise
             
         except Exception as e:
-            # Task failed
+            # Task failed; report the root cause rather than the task group wrapper
+            while isinstance(e, ExceptionGroup) and len(e.exceptions) == 1:
+                e = e.exceptions[0]
             logger.error(f"Scraper error for task {task.task_id}: {e}")
             logger.error(traceback.format_exc())
             
             task.status = "failed"
             task.error = str(e)
-            task.end_time = datetime.now()
+            task.end_time_ns = time.time_ns()
             
         finally:
             # Save task state
@@ -738,6 +1404,8 @@ class ScraperManager:
             # Remove from running tasks
             if task.task_id in self.running_tasks:
                 del self.running_tasks[task.task_id]
+            
+            task.done_event.set()
 
 # Example usage
 async def main():
@@ -762,15 +1430,15 @@ async def main():
     if success:
         # Wait for task to complete
         task = manager.get_task(task_id)
-        while task.status == "running":
-            await asyncio.sleep(1)
-            task = manager.get_task(task_id)
+        await task.done_event.wait()
         
         print(f"Task completed with status: {task.status}")
         if task.result_path:
             print(f"Results saved to: {task.result_path}")
     else:
         print("Failed to start task")
+    
+    await manager.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The scheduler and scraper are standalone modules rather than an installed package
+AUTOMATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for subdir in ("scheduler", "scraping"):
+    sys.path.insert(0, os.path.join(AUTOMATION_DIR, subdir))
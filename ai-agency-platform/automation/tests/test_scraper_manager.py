@@ -0,0 +1,244 @@
+import asyncio
+import os
+
+import orjson
+from aiohttp import web
+
+from scraper_manager import ScraperConfig, ScraperManager
+
+
+def make_config(**kwargs) -> ScraperConfig:
+    return ScraperConfig(
+        name="test",
+        scraper_type="custom",
+        target_urls=["https://example.com/"],
+        selectors={"title": "h1"},
+        **kwargs
+    )
+
+
+def read_log(manager: ScraperManager):
+    with open(manager.state_log_path, "rb") as f:
+        return [orjson.loads(line) for line in f]
+
+
+def test_state_log_replay_keeps_latest_state(tmp_path):
+    async def run():
+        manager = ScraperManager(base_dir=str(tmp_path), state_flush_interval=0)
+        task_id = await manager.create_task(make_config())
+        task = manager.get_task(task_id)
+        task.status = "completed"
+        task.stats = {"pages": 3}
+        manager._save_task_state(task)
+        await manager.aclose()
+        return task_id
+
+    task_id = asyncio.run(run())
+
+    restored = ScraperManager(base_dir=str(tmp_path))
+    task = restored.get_task(task_id)
+    assert task.status == "completed"
+    assert task.stats == {"pages": 3}
+    assert task.config.selectors == {"title": "h1"}
+
+
+def test_running_tasks_are_failed_on_load(tmp_path):
+    async def run():
+        # No aclose(): the process dies with tasks still pending and running
+        manager = ScraperManager(base_dir=str(tmp_path), state_flush_interval=0)
+        pending_id = await manager.create_task(make_config())
+        running_id = await manager.create_task(make_config())
+        done_id = await manager.create_task(make_config())
+        manager.get_task(running_id).status = "running"
+        manager._save_task_state(manager.get_task(running_id))
+        manager.get_task(done_id).status = "completed"
+        manager._save_task_state(manager.get_task(done_id))
+        await asyncio.sleep(0.1)
+        return pending_id, running_id, done_id
+
+    pending_id, running_id, done_id = asyncio.run(run())
+
+    restored = ScraperManager(base_dir=str(tmp_path))
+    # Never started, so start_task() can still run it
+    assert restored.get_task(pending_id).status == "pending"
+    assert restored.get_task(running_id).status == "failed"
+    assert restored.get_task(running_id).error
+    assert restored.get_task(done_id).status == "completed"
+    # The failed states were persisted, not only applied in memory
+    assert {record["task_id"]: record["status"] for record in read_log(restored)} == {
+        pending_id: "pending", running_id: "failed", done_id: "completed"
+    }
+
+
+def test_torn_state_log_line_is_dropped(tmp_path):
+    async def run():
+        manager = ScraperManager(base_dir=str(tmp_path), state_flush_interval=0)
+        task_id = await manager.create_task(make_config())
+        manager.get_task(task_id).status = "completed"
+        await manager.aclose()
+        return task_id
+
+    task_id = asyncio.run(run())
+    state_log_path = os.path.join(str(tmp_path), "task_states", "task_states.jsonl")
+    with open(state_log_path, "ab") as f:
+        f.write(b'{"task_id": "torn", "conf')
+
+    async def resume():
+        manager = ScraperManager(base_dir=str(tmp_path), state_flush_interval=0)
+        assert [task.task_id for task in manager.get_all_tasks()] == [task_id]
+        # Appended after the restart, so it must not land on the torn line
+        new_id = await manager.create_task(make_config())
+        await manager.aclose()
+        return new_id
+
+    new_id = asyncio.run(resume())
+
+    restored = ScraperManager(base_dir=str(tmp_path))
+    assert restored.get_task(new_id) is not None
+    assert restored.get_task(task_id).status == "completed"
+
+
+def test_crash_during_compaction_keeps_previous_log(tmp_path):
+    async def run():
+        manager = ScraperManager(base_dir=str(tmp_path), state_flush_interval=0)
+        task_id = await manager.create_task(make_config())
+        manager.get_task(task_id).status = "completed"
+        await manager.aclose()
+        return task_id
+
+    task_id = asyncio.run(run())
+    # A compaction cut short before its os.replace() leaves only the temporary file
+    with open(os.path.join(str(tmp_path), "task_states", "task_states.jsonl.tmp"), "wb") as f:
+        f.write(b'{"task_id": "partial"')
+
+    restored = ScraperManager(base_dir=str(tmp_path))
+    assert [task.task_id for task in restored.get_all_tasks()] == [task_id]
+    assert restored.get_task(task_id).status == "completed"
+
+
+def test_state_log_is_compacted_once_it_grows(tmp_path):
+    async def run():
+        manager = ScraperManager(
+            base_dir=str(tmp_path), state_flush_interval=0, state_log_compact_bytes=4096
+        )
+        task_id = await manager.create_task(make_config())
+        task = manager.get_task(task_id)
+        for page in range(200):
+            task.stats = {"pages": page}
+            manager._save_task_state(task)
+            # Yield so the writer flushes each state separately
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+
+        records = read_log(manager)
+        # Without compaction the log would hold one line per flush
+        assert len(records) < 20
+        assert records[-1]["stats"] == {"pages": 199}
+        await manager.aclose()
+        return task_id
+
+    task_id = asyncio.run(run())
+    assert ScraperManager(base_dir=str(tmp_path)).get_task(task_id).stats == {"pages": 199}
+
+
+def test_unencodable_setting_does_not_stop_the_writer(tmp_path):
+    async def run():
+        manager = ScraperManager(base_dir=str(tmp_path), state_flush_interval=0)
+        odd_id = await manager.create_task(make_config(extra_settings={"handle": object()}))
+        await asyncio.sleep(0.05)
+        # States saved after the bad one are still written
+        task_id = await manager.create_task(make_config())
+        manager.get_task(task_id).status = "completed"
+        manager._save_task_state(manager.get_task(task_id))
+        await asyncio.sleep(0.05)
+        records = {record["task_id"]: record for record in read_log(manager)}
+        await manager.aclose()
+        return odd_id, task_id, records
+
+    odd_id, task_id, records = asyncio.run(run())
+    assert records[task_id]["status"] == "completed"
+    assert isinstance(records[odd_id]["config"]["extra_settings"]["handle"], str)
+    assert ScraperManager(base_dir=str(tmp_path)).get_task(task_id).status == "completed"
+
+
+async def serve(routes) -> tuple:
+    """Start a local HTTP server for the given {path: handler} routes."""
+    app = web.Application()
+    for path, handler in routes.items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    # A host name rather than an IP, which aiohttp's cookie jar would not store cookies for
+    return runner, f"http://localhost:{port}"
+
+
+async def run_to_end(manager: ScraperManager, config: ScraperConfig):
+    task_id = await manager.create_task(config)
+    assert await manager.start_task(task_id)
+    await manager.get_task(task_id).done_event.wait()
+    return manager.get_task(task_id)
+
+
+def test_http_tasks_do_not_share_cookies(tmp_path):
+    seen = []
+
+    async def login(request):
+        response = web.Response(text="<html><h1>in</h1></html>", content_type="text/html")
+        response.set_cookie("session", "task-a")
+        return response
+
+    async def check(request):
+        seen.append(dict(request.cookies))
+        return web.Response(text="<html><h1>out</h1></html>", content_type="text/html")
+
+    async def run():
+        runner, base = await serve({"/login": login, "/check": check})
+        manager = ScraperManager(base_dir=str(tmp_path), proxy_rotation_enabled=False)
+        try:
+            for path in ("/login", "/check"):
+                config = ScraperConfig(
+                    name="http", scraper_type="beautifulsoup",
+                    target_urls=[base + path], selectors={"title": "h1"}
+                )
+                assert (await run_to_end(manager, config)).status == "completed"
+        finally:
+            await manager.aclose()
+            await runner.cleanup()
+
+    asyncio.run(run())
+    # The cookie set during the first task is not sent by the second
+    assert seen == [{}]
+
+
+def test_http_pages_with_an_xml_declaration_are_parsed(tmp_path):
+    async def xhtml(request):
+        body = '<?xml version="1.0" encoding="iso-8859-1"?><html><body><h1>Caf\xe9</h1></body></html>'
+        return web.Response(body=body.encode("latin-1"), content_type="application/xhtml+xml")
+
+    async def undeclared(request):
+        # No charset in the header or the page; decoded as aiohttp would
+        return web.Response(body="<html><h1>na\xefve</h1></html>".encode("utf-8"), content_type="text/html")
+
+    async def run():
+        runner, base = await serve({"/xhtml": xhtml, "/plain": undeclared})
+        manager = ScraperManager(base_dir=str(tmp_path), proxy_rotation_enabled=False)
+        try:
+            config = ScraperConfig(
+                name="http", scraper_type="beautifulsoup", output_format="jsonl",
+                target_urls=[base + "/xhtml", base + "/plain"], selectors={"title": "h1"},
+                rate_limit=100, extra_settings={"max_in_flight": 1}
+            )
+            task = await run_to_end(manager, config)
+        finally:
+            await manager.aclose()
+            await runner.cleanup()
+        return task
+
+    task = asyncio.run(run())
+    assert task.status == "completed"
+    with open(task.result_path, "rb") as f:
+        titles = sorted(orjson.loads(line)["title"][0] for line in f)
+    assert titles == ["Caf\xe9", "na\xefve"]
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from task_scheduler import Task, TaskScheduler
+
+
+async def echo_handler(task: Task):
+    return task.params
+
+
+def make_scheduler(tmp_path, **kwargs) -> TaskScheduler:
+    scheduler = TaskScheduler(storage_path=str(tmp_path / "tasks.json"), **kwargs)
+    scheduler.register_handler("echo", echo_handler)
+    return scheduler
+
+
+def crash(scheduler: TaskScheduler):
+    """Drop a scheduler without shutdown(), as if the process had died."""
+    scheduler._writer.shutdown(wait=True)
+    scheduler._journal.close()
+
+
+def later(minutes: int = 60) -> datetime:
+    return datetime.now() + timedelta(minutes=minutes)
+
+
+def test_journal_replay_restores_tasks(tmp_path):
+    async def run():
+        scheduler = make_scheduler(tmp_path)
+        for i in range(3):
+            scheduler.schedule_task(Task(f"t{i}", "echo", {"n": i}, later(), priority=i))
+        scheduler.cancel_task("t1")
+        await scheduler._flush()
+        crash(scheduler)
+
+    asyncio.run(run())
+
+    restored = make_scheduler(tmp_path)
+    assert {task.task_id: task.status for task in restored.get_all_tasks()} == {
+        "t0": "scheduled", "t1": "cancelled", "t2": "scheduled"
+    }
+    assert restored.get_task("t2").params == {"n": 2}
+    # Only scheduled tasks go back on the heap
+    assert sorted(task_id for _, _, task_id in restored._heap) == ["t0", "t2"]
+    crash(restored)
+
+
+def test_torn_journal_line_is_dropped(tmp_path):
+    async def run():
+        scheduler = make_scheduler(tmp_path)
+        scheduler.schedule_task(Task("kept", "echo", {}, later()))
+        await scheduler._flush()
+        crash(scheduler)
+
+    asyncio.run(run())
+    with open(tmp_path / "tasks.json.journal", "ab") as f:
+        f.write(b'{"id": "torn", "op": "ups')
+
+    async def resume():
+        scheduler = make_scheduler(tmp_path)
+        assert [task.task_id for task in scheduler.get_all_tasks()] == ["kept"]
+        # The next entry must not be appended onto the torn line
+        scheduler.schedule_task(Task("after", "echo", {}, later()))
+        await scheduler._flush()
+        crash(scheduler)
+
+    asyncio.run(resume())
+
+    restored = make_scheduler(tmp_path)
+    assert sorted(task.task_id for task in restored.get_all_tasks()) == ["after", "kept"]
+    crash(restored)
+
+
+def test_crash_during_compaction_keeps_snapshot_state(tmp_path):
+    async def run():
+        scheduler = make_scheduler(tmp_path)
+        scheduler.schedule_task(Task("t", "echo", {}, later()))
+        await scheduler._flush()
+        stale_journal = (tmp_path / "tasks.json.journal").read_bytes()
+
+        scheduler.cancel_task("t")
+        await scheduler.save_tasks()
+        crash(scheduler)
+
+        # The snapshot was replaced but the process died before the journal was truncated
+        (tmp_path / "tasks.json.journal").write_bytes(stale_journal)
+        # ...or while writing the next snapshot
+        (tmp_path / "tasks.json.tmp").write_bytes(b'{"t": {"task_')
+
+    asyncio.run(run())
+
+    restored = make_scheduler(tmp_path)
+    assert restored.get_task("t").status == "cancelled"
+    assert restored._heap == []
+    crash(restored)
+
+    # The stale journal was discarded, so changes made after the restart survive
+    async def resume():
+        scheduler = make_scheduler(tmp_path)
+        scheduler.schedule_task(Task("u", "echo", {}, later()))
+        await scheduler._flush()
+        crash(scheduler)
+
+    asyncio.run(resume())
+    restored = make_scheduler(tmp_path)
+    assert restored.get_task("u").status == "scheduled"
+    crash(restored)
+
+
+def test_dispatch_follows_schedule_time_then_priority(tmp_path):
+    order = []
+
+    async def record(task: Task):
+        order.append(task.task_id)
+
+    async def run():
+        scheduler = make_scheduler(tmp_path, max_concurrent_tasks=1)
+        scheduler.register_handler("record", record)
+        now = time.time()
+        for task_id, offset, priority in [
+            ("late", -1, 0), ("early-low", -3, 5), ("early-high", -3, 1), ("middle", -2, 9)
+        ]:
+            scheduler.schedule_task(Task(task_id, "record", {}, now + offset, priority=priority))
+
+        await scheduler.start()
+        while len(order) < 4:
+            await asyncio.sleep(0.01)
+        await scheduler.shutdown()
+
+    asyncio.run(run())
+    assert order == ["early-high", "early-low", "middle", "late"]
+
+
+def test_status_index_tracks_transitions(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    for i in range(3):
+        scheduler.schedule_task(Task(f"t{i}", "echo", {}, later()))
+    scheduler.cancel_task("t0")
+
+    assert sorted(task.task_id for task in scheduler.get_tasks_by_status("scheduled")) == ["t1", "t2"]
+    assert [task.task_id for task in scheduler.get_tasks_by_status("cancelled")] == ["t0"]
+    assert scheduler.get_tasks_by_status("running") == []
+    crash(scheduler)
+
+
+def test_full_io_pool_does_not_hold_back_cpu_tasks(tmp_path):
+    started = []
+
+    async def slow_io(task: Task):
+        started.append(task.task_id)
+        await asyncio.sleep(0.2)
+
+    def compute(task: Task):
+        started.append(task.task_id)
+
+    async def run():
+        scheduler = make_scheduler(tmp_path, max_concurrent_tasks=1, max_cpu_tasks=1)
+        scheduler.register_handler("io", slow_io)
+        scheduler.register_handler("cpu", compute, kind="cpu")
+        now = time.time()
+        for i in range(3):
+            scheduler.schedule_task(Task(f"io{i}", "io", {}, now - 1, priority=i))
+        scheduler.schedule_task(Task("cpu", "cpu", {}, now - 1, priority=9))
+
+        await scheduler.start()
+        await asyncio.sleep(0.1)
+        # One IO task holds the only IO slot; the CPU task still ran
+        assert started == ["io0", "cpu"]
+        assert len(scheduler.get_tasks_by_status("running")) == 1
+        while len(started) < 4:
+            await asyncio.sleep(0.01)
+        await scheduler.shutdown()
+
+    asyncio.run(run())
+    assert started == ["io0", "cpu", "io1", "io2"]
+
+
+def test_coroutine_cpu_handler_is_rejected(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    with pytest.raises(ValueError):
+        scheduler.register_handler("bad", echo_handler, kind="cpu")
+    crash(scheduler)
+
+
+def test_failed_task_is_retried(tmp_path):
+    attempts = []
+
+    async def flaky(task: Task):
+        attempts.append(task.retry_count)
+        if len(attempts) == 1:
+            raise RuntimeError("first attempt fails")
+        return "ok"
+
+    async def run():
+        scheduler = make_scheduler(tmp_path)
+        scheduler.register_handler("flaky", flaky)
+        scheduler.schedule_task(Task("f", "flaky", {}, time.time(), retry_delay=0))
+        await scheduler.start()
+        while scheduler.get_task("f").status != "completed":
+            await asyncio.sleep(0.01)
+        await scheduler.shutdown()
+        return scheduler.get_task("f")
+
+    task = asyncio.run(run())
+    assert attempts == [0, 1]
+    assert task.result == "ok"
@@ -1,13 +1,21 @@
 from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set
 import asyncio
 import json
 import logging
+import os
+import re
+import secrets
+import time
+from functools import lru_cache
+import orjson
+from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from types import MappingProxyType
 
 # Configure logging
 logging.basicConfig(
@@ -21,12 +29,21 @@ app = FastAPI(
     title="AI Agency Platform API",
     description="Backend API for the AI Agency Platform",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Allowed CORS origins, matched with one anchored regex. CORS_ORIGIN_REGEX takes
+# precedence; otherwise the comma-separated CORS_ORIGINS list is turned into one.
+CORS_ORIGIN_REGEX = os.environ.get("CORS_ORIGIN_REGEX") or "^(?:{})$".format("|".join(
+    re.escape(origin.strip())
+    for origin in os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+))
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
+    allow_origin_regex=CORS_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -35,6 +52,12 @@ app.add_middleware(
 # OAuth2 token URL
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# JWT signing settings. Without JWT_SECRET_KEY a random key is generated, so tokens
+# stop validating whenever the process restarts.
+JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY") or secrets.token_urlsafe(32)
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
 # --- Data Models ---
 
 class User(BaseModel):
@@ -89,31 +112,92 @@ class Template(BaseModel):
 # --- WebSocket Connection Manager ---
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
-        if client_id not in self.active_connections:
-            self.active_connections[client_id] = []
-        self.active_connections[client_id].append(websocket)
+    def __init__(
+        self,
+        max_concurrent_sends: int = 64,
+        max_connections: int = 1000,
+        max_connections_per_client: int = 5,
+        max_batch_size: int = 64,
+        max_queued_messages: int = 1024
+    ):
+        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # Each socket gets an outbound queue drained by its own sender task, which
+        # coalesces whatever has queued up into a single JSON-array frame
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        self.max_batch_size = max_batch_size
+        self.max_queued_messages = max_queued_messages
+        # Caps how many frames are being written at once across all sockets
+        self._send_slots = asyncio.Semaphore(max_concurrent_sends)
+        # Caps open sockets so client churn can't exhaust file descriptors or memory
+        self._connection_slots = asyncio.BoundedSemaphore(max_connections)
+        self.max_connections_per_client = max_connections_per_client
+
+    async def connect(self, websocket: WebSocket, client_id: str) -> bool:
+        connections = self.active_connections.get(client_id, ())
+        if self._connection_slots.locked() or len(connections) >= self.max_connections_per_client:
+            # Accept first so the client receives the close code (1013: try again later)
+            await websocket.accept()
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            logger.warning(f"Rejected connection for client {client_id}: connection limit reached")
+            return False
+        
+        # Never blocks: the semaphore was just checked and nothing awaited since
+        await self._connection_slots.acquire()
+        self.active_connections.setdefault(client_id, set()).add(websocket)
+        outbox = self._outboxes[websocket] = asyncio.Queue(self.max_queued_messages)
+        try:
+            await websocket.accept()
+        except Exception:
+            self.disconnect(websocket, client_id)
+            raise
+        # Start sending only once accepted; anything queued meanwhile goes out in the first batch
+        self._senders[websocket] = asyncio.create_task(self._sender(websocket, client_id, outbox))
         logger.info(f"Client {client_id} connected. Total connections: {len(self.active_connections)}")
+        return True
 
     def disconnect(self, websocket: WebSocket, client_id: str):
-        if client_id in self.active_connections:
-            self.active_connections[client_id].remove(websocket)
-            if not self.active_connections[client_id]:
+        connections = self.active_connections.get(client_id)
+        if connections is not None and websocket in connections:
+            connections.discard(websocket)
+            if not connections:
                 del self.active_connections[client_id]
+            del self._outboxes[websocket]
+            sender = self._senders.pop(websocket, None)
+            if sender is not None and sender is not asyncio.current_task():
+                sender.cancel()
+            self._connection_slots.release()
             logger.info(f"Client {client_id} disconnected. Remaining connections: {len(self.active_connections)}")
 
+    async def _sender(self, websocket: WebSocket, client_id: str, outbox: asyncio.Queue):
+        try:
+            while True:
+                messages = [await outbox.get()]
+                while not outbox.empty() and len(messages) < self.max_batch_size:
+                    messages.append(outbox.get_nowait())
+                async with self._send_slots:
+                    await websocket.send_text(orjson.dumps(messages).decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Dropping connection for client {client_id}: {e}")
+            self.disconnect(websocket, client_id)
+
+    def _enqueue(self, websocket: WebSocket, message: str, client_id: str):
+        try:
+            self._outboxes[websocket].put_nowait(message)
+        except asyncio.QueueFull:
+            # A consumer this far behind gets messages dropped rather than unbounded memory
+            logger.warning(f"Send queue full for client {client_id}; dropping message")
+
     async def send_message(self, message: str, client_id: str):
-        if client_id in self.active_connections:
-            for connection in self.active_connections[client_id]:
-                await connection.send_text(message)
+        for connection in self.active_connections.get(client_id, ()):
+            self._enqueue(connection, message, client_id)
 
     async def broadcast(self, message: str):
-        for client_id in self.active_connections:
-            await self.send_message(message, client_id)
+        for client_id, connections in self.active_connections.items():
+            for connection in connections:
+                self._enqueue(connection, message, client_id)
 
 # Initialize connection manager
 manager = ConnectionManager()
@@ -124,9 +208,21 @@ manager = ConnectionManager()
 async def root():
     return {"message": "Welcome to the AI Agency Platform API"}
 
+# (epoch second, ISO string) of the last health check, so bursts share one formatted timestamp
+_health_timestamp = [0, ""]
+
+def _health_timestamp_iso() -> str:
+    second = int(time.time())
+    if second != _health_timestamp[0]:
+        _health_timestamp[:] = second, datetime.fromtimestamp(second).isoformat()
+    return _health_timestamp[1]
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": _health_timestamp_iso()
+    }
 
 # --- Authentication Endpoints ---
 
@@ -135,9 +231,14 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     # This is a placeholder - in a real app, validate against a database
     # For demo purposes, accept any username/password
     if form_data.username and form_data.password:
-        # In a real app, this would be a JWT with proper expiration, etc.
+        expires_at = int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        access_token = jwt.encode(
+            {"sub": form_data.username, "exp": expires_at},
+            JWT_SECRET_KEY,
+            algorithm=JWT_ALGORITHM
+        )
         return {
-            "access_token": f"demo_token_{form_data.username}",
+            "access_token": access_token,
             "token_type": "bearer"
         }
     raise HTTPException(
@@ -146,102 +247,137 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+@lru_cache(maxsize=4096)
+def _parse_token(token: str) -> tuple:
+    # Verifies the signature once per token; the cached (User, expiry) pair is reused
+    # for later requests, and get_current_user re-checks the expiry on every hit
+    payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    username = payload.get("sub")
+    if not username:
+        raise JWTError("Token has no subject")
+    # Placeholder - in a real app, load the user from the database
+    return User(username=username, email=f"{username}@example.com"), payload["exp"]
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    # This is a placeholder - in a real app, validate the token
-    # For demo purposes, extract username from token
     try:
-        username = token.replace("demo_token_", "")
-        return User(username=username, email=f"{username}@example.com")
-    except:
+        user, expires_at = _parse_token(token)
+    except (JWTError, KeyError):
+        user, expires_at = None, 0
+    if user is None or expires_at <= time.time():
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user
 
 # --- Project Endpoints ---
 
-@app.get("/api/projects", response_model=List[Project])
-async def get_projects(current_user: User = Depends(get_current_user)):
-    # Placeholder - in a real app, fetch from database
-    return [
-        {
+# Placeholder projects, built once: (read-only static fields, created ago, updated ago)
+_PROJECTS = (
+    (
+        MappingProxyType({
             "id": "project1",
             "name": "E-commerce Scraper",
             "description": "Scrape product data from major e-commerce sites",
             "template_id": "template1",
-            "owner_id": current_user.username,
-            "created_at": datetime.now() - timedelta(days=5),
-            "updated_at": datetime.now() - timedelta(days=1),
             "status": "active"
-        },
-        {
+        }),
+        timedelta(days=5),
+        timedelta(days=1)
+    ),
+    (
+        MappingProxyType({
             "id": "project2",
             "name": "Social Media Monitor",
             "description": "Monitor mentions across social platforms",
             "template_id": "template2",
-            "owner_id": current_user.username,
-            "created_at": datetime.now() - timedelta(days=10),
-            "updated_at": datetime.now() - timedelta(days=2),
             "status": "active"
+        }),
+        timedelta(days=10),
+        timedelta(days=2)
+    )
+)
+
+@app.get("/api/projects", response_model=List[Project])
+async def get_projects(current_user: User = Depends(get_current_user)):
+    # Placeholder - in a real app, fetch from database.
+    # Returning a response directly skips re-validating these trusted dicts through
+    # response_model, which is still used for the OpenAPI schema.
+    now = datetime.now()
+    return ORJSONResponse([
+        {
+            **project,
+            "owner_id": current_user.username,
+            "created_at": now - created_ago,
+            "updated_at": now - updated_ago
         }
-    ]
+        for project, created_ago, updated_ago in _PROJECTS
+    ])
 
 @app.post("/api/projects", response_model=Project)
 async def create_project(project: ProjectCreate, current_user: User = Depends(get_current_user)):
     # Placeholder - in a real app, save to database
+    now = datetime.now()
     return {
-        "id": f"new_project_{datetime.now().timestamp()}",
+        "id": f"new_project_{now.timestamp()}",
         "name": project.name,
         "description": project.description,
         "template_id": project.template_id,
         "owner_id": current_user.username,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now(),
+        "created_at": now,
+        "updated_at": now,
         "status": "created"
     }
 
 # --- Template Endpoints ---
 
+# Placeholder templates, validated once at import into an immutable tuple of models
+_TEMPLATES = tuple(Template(**template) for template in (
+    {
+        "id": "template1",
+        "name": "E-commerce Scraper",
+        "description": "Extract product data from major e-commerce platforms",
+        "category": "Scraping",
+        "config": {
+            "selectors": {
+                "product_title": ".product-title",
+                "product_price": ".product-price",
+                "product_description": ".product-description"
+            },
+            "proxy_rotation": True,
+            "captcha_handling": True
+        },
+        "preview_image": "/images/templates/ecommerce.png"
+    },
+    {
+        "id": "template2",
+        "name": "Social Media Monitor",
+        "description": "Track mentions and sentiment across social platforms",
+        "category": "Monitoring",
+        "config": {
+            "platforms": ["twitter", "instagram", "facebook"],
+            "keywords": ["example", "keywords"],
+            "sentiment_analysis": True
+        },
+        "preview_image": "/images/templates/social-media.png"
+    }
+))
+
+# The template list never changes, so it is serialized once too
+_TEMPLATES_JSON = orjson.dumps([template.model_dump() for template in _TEMPLATES])
+
 @app.get("/api/templates", response_model=List[Template])
 async def get_templates():
     # Placeholder - in a real app, fetch from database
-    return [
-        {
-            "id": "template1",
-            "name": "E-commerce Scraper",
-            "description": "Extract product data from major e-commerce platforms",
-            "category": "Scraping",
-            "config": {
-                "selectors": {
-                    "product_title": ".product-title",
-                    "product_price": ".product-price",
-                    "product_description": ".product-description"
-                },
-                "proxy_rotation": True,
-                "captcha_handling": True
-            },
-            "preview_image": "/images/templates/ecommerce.png"
-        },
-        {
-            "id": "template2",
-            "name": "Social Media Monitor",
-            "description": "Track mentions and sentiment across social platforms",
-            "category": "Monitoring",
-            "config": {
-                "platforms": ["twitter", "instagram", "facebook"],
-                "keywords": ["example", "keywords"],
-                "sentiment_analysis": True
-            },
-            "preview_image": "/images/templates/social-media.png"
-        }
-    ]
+    return Response(_TEMPLATES_JSON, media_type="application/json")
 
 # --- WebSocket Endpoints ---
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(websocket, client_id)
+    if not await manager.connect(websocket, client_id):
+        return
     try:
         while True:
             data = await websocket.receive_text()
@@ -250,6 +386,10 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     except WebSocketDisconnect:
         manager.disconnect(websocket, client_id)
         await manager.broadcast(f"Client #{client_id} left the chat")
+    finally:
+        # Release the slot however the loop ended, e.g. on a binary frame;
+        # disconnect() ignores a socket that is already gone
+        manager.disconnect(websocket, client_id)
 
 # --- Scraping Task Endpoints ---
 
@@ -261,31 +401,46 @@ async def create_scraping_task(
     current_user: User = Depends(get_current_user)
 ):
     # Placeholder - in a real app, create a task in the database and queue
-    task_id = f"task_{datetime.now().timestamp()}"
+    now = datetime.now()
+    task_id = f"task_{now.timestamp()}"
     return {
         "id": task_id,
         "project_id": project_id,
         "target_url": target_url,
         "config": config,
         "status": "pending",
-        "created_at": datetime.now()
+        "created_at": now
     }
 
+# Static fields of the placeholder scraping task
+_SCRAPING_TASK = MappingProxyType({
+    "project_id": "project1",
+    "target_url": "https://example.com",
+    "config": {"selector": ".product"},
+    "status": "completed"
+})
+
 @app.get("/api/scraping-tasks/{task_id}", response_model=ScrapingTask)
 async def get_scraping_task(task_id: str, current_user: User = Depends(get_current_user)):
     # Placeholder - in a real app, fetch from database
-    return {
+    now = datetime.now()
+    return ORJSONResponse({
+        **_SCRAPING_TASK,
         "id": task_id,
-        "project_id": "project1",
-        "target_url": "https://example.com",
-        "config": {"selector": ".product"},
-        "status": "completed",
-        "created_at": datetime.now() - timedelta(hours=1),
-        "updated_at": datetime.now(),
+        "created_at": now - timedelta(hours=1),
+        "updated_at": now,
         "result_id": f"result_{task_id}"
-    }
+    })
 
 # Run app with: uvicorn app.main:app --reload
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+    )
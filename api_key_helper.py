@@ -5,12 +5,43 @@ This can be used with the Uncensored-HackerCoding-GPT configuration.
 """
 
 import os
-from typing import Optional
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+    import json
+
+def _dump_config(config: Any) -> bytes:
+    """Serialize a configuration as 2-space indented JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    return json.dumps(config, indent=2).encode()
+
+def _load_config(data: bytes) -> Any:
+    """Parse JSON configuration bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Snapshot of the environment taken at import; see refresh_env()
+_ENV = dict(os.environ)
+
+def refresh_env() -> None:
+    """
+    Re-snapshot the environment, for variables set or changed after this module was imported.
+    """
+    global _ENV
+    _ENV = dict(os.environ)
 
 def get_api_key(key_name: str, default_value: Optional[str] = None) -> Optional[str]:
     """
     Retrieve an API key from environment variables.
     
+    Lookups use the snapshot taken at import; call refresh_env() first if the
+    environment may have changed since.
+    
     Args:
         key_name: The name of the environment variable containing the API key
         default_value: A default value to return if the key is not found
@@ -25,7 +56,7 @@ def get_api_key(key_name: str, default_value: Optional[str] = None) -> Optional[
         # With a default value
         hf_api_key = get_api_key('HUGGINGFACE_API_KEY', 'default-key')
     """
-    return os.environ.get(key_name, default_value)
+    return _ENV.get(key_name, default_value)
 
 def update_config_with_env_key(config_path: str, key_env_var: str, key_default: str = None) -> bool:
     """
@@ -47,8 +78,6 @@ def update_config_with_env_key(config_path: str, key_env_var: str, key_default:
             'your-default-key'
         )
     """
-    import json
-    
     # Get the API key from environment or use default
     api_key = get_api_key(key_env_var, key_default)
     if not api_key:
@@ -57,8 +86,9 @@ def update_config_with_env_key(config_path: str, key_env_var: str, key_default:
     
     try:
         # Read the configuration file
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        with open(config_path, 'rb') as f:
+            original = f.read()
+        config = _load_config(original)
         
         # Update the API key
         if "api_config" in config:
@@ -66,9 +96,14 @@ def update_config_with_env_key(config_path: str, key_env_var: str, key_default:
             if "headers" in config["api_config"] and "Authorization" in config["api_config"]["headers"]:
                 config["api_config"]["headers"]["Authorization"] = f"Bearer {api_key}"
         
-        # Write the updated configuration
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Write the updated configuration, skipping the rewrite if nothing changed
+        updated = _dump_config(config)
+        if updated == original:
+            print(f"{config_path} already has the API key from {key_env_var}")
+            return True
+        
+        with open(config_path, 'wb') as f:
+            f.write(updated)
         
         print(f"Successfully updated {config_path} with API key from {key_env_var}")
         return True
@@ -17,8 +17,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
 import base64
-from io import BytesIO
-import tempfile
+from io import BytesIO, StringIO
+import queue
+import hashlib
+import importlib.util
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +44,13 @@ except ImportError:
     from core.coordinator import Agent, Message
     from core.model_loader import ModelLoader
 
+# torch is needed for the Hugging Face and vision models only; GGUF models run without it
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
 # Try to import document processing libraries
 try:
     import PyPDF2
@@ -48,6 +61,37 @@ except ImportError:
     logger.warning("PDF/Image processing libraries not available. Install with pip install PyPDF2 pillow pytesseract")
     PDF_SUPPORT = False
 
+try:
+    from tesserocr import PyTessBaseAPI
+    TESSEROCR_SUPPORT = True
+except ImportError:
+    logger.info("tesserocr not available, OCR will run the tesseract CLI per page. Install with pip install tesserocr")
+    TESSEROCR_SUPPORT = False
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_SUPPORT = True
+except ImportError:
+    logger.info("pypdfium2 not available, falling back to PyPDF2 for PDF text. Install with pip install pypdfium2")
+    PDFIUM_SUPPORT = False
+
+try:
+    import pyarrow
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    logger.info("pyarrow not available, using the default CSV parser. Install with pip install pyarrow")
+    CSV_ENGINE = "c"
+
+try:
+    import polars as pl
+    POLARS_SUPPORT = True
+except ImportError:
+    logger.info("polars not available, summarizing DataFrames with pandas. Install with pip install polars")
+    POLARS_SUPPORT = False
+
+# CSVs larger than this are read in two passes: a 10-row preview, then only the numeric columns
+CSV_SINGLE_PASS_BYTES = 64 * 1024 * 1024
+
 try:
     import docx
     DOCX_SUPPORT = True
@@ -62,6 +106,54 @@ except ImportError:
     logger.warning("Excel processing library not available. Install with pip install openpyxl")
     EXCEL_SUPPORT = False
 
+try:
+    import python_calamine
+    # The Rust-backed calamine reader skips openpyxl's per-cell style objects (pandas >= 2.2)
+    EXCEL_ENGINE = "calamine" if tuple(int(v) for v in pd.__version__.split(".")[:2]) >= (2, 2) else None
+except ImportError:
+    logger.info("python-calamine not available, reading Excel files with openpyxl. Install with pip install python-calamine")
+    EXCEL_ENGINE = None
+EXCEL_SUPPORT = EXCEL_SUPPORT or EXCEL_ENGINE is not None
+
+# flash-attn is only probed here; transformers imports it when the model is loaded
+FLASH_ATTN_SUPPORT = importlib.util.find_spec("flash_attn") is not None
+
+# Regular expressions used on every message, compiled once at import
+_FILE_REF_RE = re.compile(
+    r'(analyze|examine|review|process|read|extract from)\s+([a-zA-Z0-9_\-\./]+\.(pdf|docx?|xlsx?|csv|txt|png|jpg|jpeg))',
+    re.IGNORECASE
+)
+_FILE_NAME_RE = re.compile(r'([a-zA-Z0-9_\-\./]+\.(pdf|docx?|xlsx?|csv|txt|png|jpg|jpeg))')
+_PY_BLOCK_RE = re.compile(r'```python(.*?)```', re.DOTALL)
+_ASSISTANT_PREFIX_RE = re.compile(r"^Assistant:\s*")
+_PLOT_HINT_RE = re.compile(r'plt\.|matplotlib|sns\.|\.plot\(')
+_SAVEFIG_RE = re.compile(r'plt\.savefig')
+
+_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+_VISION_PROMPT = "Describe this image in detail, focusing on business-relevant information."
+
+# Task descriptions keyed by trigger phrases, in priority order
+_TASKS = (
+    (("analyze pdf", "extract from pdf", "read pdf"),
+     "Extract and analyze information from the provided PDF document."),
+    (("analyze image", "look at image", "what's in this image"),
+     "Analyze the provided image and extract relevant information."),
+    (("analyze spreadsheet", "excel data", "csv data"),
+     "Analyze the provided spreadsheet/CSV data and extract key insights."),
+    (("visualize", "create chart", "plot", "graph"),
+     "Create appropriate data visualizations based on the provided data."),
+    (("trend", "pattern", "correlation"),
+     "Identify trends, patterns, or correlations in the provided data."),
+    (("predict", "forecast", "projection"),
+     "Provide predictive analysis or forecasting based on historical data."),
+    (("summarize", "summary", "key points"),
+     "Summarize key findings and insights from the data."),
+)
+_DEFAULT_TASK = "Analyze the provided data or request and provide useful insights."
+_TASK_PRIORITY = {phrase: priority for priority, (phrases, _) in enumerate(_TASKS) for phrase in phrases}
+# One scan finds every trigger phrase; the lookahead keeps overlapping phrases visible
+_TASK_RE = re.compile("(?=({}))".format("|".join(map(re.escape, _TASK_PRIORITY))))
+
 
 class DataAnalyzerAgent(Agent):
     """
@@ -96,16 +188,17 @@ When working with numerical data, include specific metrics and statistics.
 Always verify the reliability and source of data before drawing conclusions.
 """
         
-        # Set up template for LLM prompting
+        # Set up template for LLM prompting. The parts that change least come first, so
+        # llama.cpp can reuse its KV cache for the shared prompt prefix between calls.
         self.prompt_template = """
 {system_message}
 
-# Context:
-{context}
-
 # Conversation History:
 {conversation_history}
 
+# Context:
+{context}
+
 # Current Request:
 {current_message}
 
@@ -126,15 +219,44 @@ If code is needed to process or visualize data, include it.
         
         # Configure from kwargs
         self.max_history = kwargs.get("max_history", 10)
+        # Formatted history, maintained incrementally by update_history(): the most recent
+        # messages before the current one, and their joined text for the next prompt
+        self._history_formatted = deque(maxlen=max(self.max_history - 1, 0))
+        self._history_text = ""
         self.context_length = kwargs.get("context_length", 4096)
         self.temperature = kwargs.get("temperature", 0.7)
         self.top_p = kwargs.get("top_p", 0.9)
+        self.prompt_cache_bytes = kwargs.get("prompt_cache_bytes", 1 << 30)
+        
+        # Responses to repeated prompts, reused only while generation is deterministic
+        self.response_cache_size = kwargs.get("response_cache_size", 256)
+        self._response_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        
+        # Extracted document text keyed by (path, mtime, size), so follow-up questions
+        # about the same file skip re-parsing; documents may be processed on several threads
+        self.document_cache_size = kwargs.get("document_cache_size", 50)
+        self._doc_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._doc_cache_lock = threading.Lock()
+        
+        # Compiled plot code keyed by a hash of its source; regenerated responses
+        # often repeat the same block
+        self._code_cache: "OrderedDict[bytes, Any]" = OrderedDict()
+        
+        # Results of analyze_data, keyed by a hash of string input or by the identity and
+        # layout of a DataFrame, so repeated turns over the same data skip the column scans
+        self._analysis_cache: "OrderedDict[Tuple, Tuple[Optional[weakref.ref], str]]" = OrderedDict()
         
         # Check for vision model capability
         self.vision_model_name = kwargs.get("vision_model_name", "Kimi-VL-A3B")
         self.use_vision_model = kwargs.get("use_vision_model", True)
         self.vision_model = None
         self.vision_processor = None
+        
+        # Preloaded globals for executing plot code, built on first use
+        self._plot_globals = None
+        
+        # Idle Tesseract API handles; each loads its language model once and is reused
+        self._tess_apis = queue.SimpleQueue()
     
     def initialize(self, model_loader: ModelLoader) -> bool:
         """
@@ -154,15 +276,28 @@ If code is needed to process or visualize data, include it.
                     model_path=self.model_name,
                     agent_name=self.name,
                     n_ctx=self.context_length,
-                    model_kwargs={"n_threads": 4}  # Use 4 threads for better CPU inference
+                    # Use 4 threads for better CPU inference; only the last token's logits are needed
+                    model_kwargs={"n_threads": 4, "logits_all": False}
                 )
                 logger.info(f"Loaded GGUF model for {self.name}")
+                
+                # Keep evaluated prompt states so a later prompt sharing a prefix (system
+                # message, earlier history) resumes from the cached KV state
+                if self.prompt_cache_bytes:
+                    try:
+                        from llama_cpp import LlamaRAMCache
+                        self.model.set_cache(LlamaRAMCache(capacity_bytes=self.prompt_cache_bytes))
+                    except (ImportError, AttributeError) as e:
+                        logger.warning(f"Prompt caching not available for {self.name}: {str(e)}")
             else:
-                # Load Hugging Face model
+                # Load Hugging Face model as NF4 4-bit, computing in bf16 and using
+                # FlashAttention-2 where the GPU and installed packages support them
                 self.model, self.tokenizer = model_loader.load_hf_model(
                     model_name=self.model_name,
                     agent_name=self.name,
-                    quantization="4bit" 
+                    quantization="4bit",
+                    torch_dtype=self._preferred_dtype(),
+                    attn_implementation="flash_attention_2" if FLASH_ATTN_SUPPORT else None
                 )
                 logger.info(f"Loaded HF model for {self.name}")
             
@@ -172,7 +307,8 @@ If code is needed to process or visualize data, include it.
                     self.vision_model, self.vision_processor = model_loader.load_hf_model(
                         model_name=self.vision_model_name,
                         agent_name=f"{self.name}_vision",
-                        model_type="multimodal"
+                        model_type="multimodal",
+                        torch_dtype=self._preferred_dtype()
                     )
                     logger.info(f"Loaded vision model {self.vision_model_name}")
                 except Exception as e:
@@ -185,6 +321,18 @@ If code is needed to process or visualize data, include it.
             logger.error(f"Error initializing {self.name}: {str(e)}")
             return False
     
+    def _preferred_dtype(self) -> Optional[Any]:
+        """
+        Get the weight dtype to request for Hugging Face models
+
+        Returns:
+            torch.bfloat16 on GPUs that support it, else None for the loader's default
+        """
+        # bf16 keeps fp32's range at half the memory traffic
+        if TORCH_AVAILABLE and torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+            return torch.bfloat16
+        return None
+    
     def process_message(self, message: Message) -> Message:
         """
         Process a message and generate a response
@@ -198,25 +346,42 @@ If code is needed to process or visualize data, include it.
         # Update conversation history
         self.update_history(message)
         
-        # Check if it's a data analysis request or document processing request
-        content = message.content.lower()
-        
         # Extract context based on the request
         context = ""
         files_to_analyze = []
         
         # Look for file references in the message
-        if re.search(r'(analyze|examine|review|process|read|extract from)\s+([a-zA-Z0-9_\-\./]+\.(pdf|docx?|xlsx?|csv|txt|png|jpg|jpeg))', message.content, re.IGNORECASE):
+        if _FILE_REF_RE.search(message.content):
             # Extract filenames
-            matches = re.findall(r'([a-zA-Z0-9_\-\./]+\.(pdf|docx?|xlsx?|csv|txt|png|jpg|jpeg))', message.content)
-            for match in matches:
-                files_to_analyze.append(match[0])
+            files_to_analyze = [match.group(1) for match in _FILE_NAME_RE.finditer(message.content)]
+            
+            # Several images go through the vision model as one batch
+            file_contents = {}
+            if self.use_vision_model and self.vision_model is not None:
+                image_files = [
+                    filename for filename in dict.fromkeys(files_to_analyze)
+                    if filename.lower().endswith(_IMAGE_EXTENSIONS)
+                    and os.path.exists(self._resolve_document_path(filename))
+                ]
+                if len(image_files) > 1:
+                    file_contents.update(zip(image_files, self._analyze_images_batch(
+                        [self._resolve_document_path(filename) for filename in image_files]
+                    )))
             
-            # Process files and add to context
-            for filename in files_to_analyze:
-                file_content = self._process_document(filename)
-                if file_content:
-                    context += f"Content from file '{filename}':\n{file_content}\n\n"
+            # Process the remaining files. PDF parsing, OCR and spreadsheet reads
+            # spend most of their time in native code, so several files run on threads.
+            remaining_files = [filename for filename in files_to_analyze if filename not in file_contents]
+            if len(remaining_files) > 1:
+                with ThreadPoolExecutor(max_workers=min(8, len(remaining_files))) as executor:
+                    file_contents.update(zip(remaining_files, executor.map(self._process_document, remaining_files)))
+            else:
+                file_contents.update((filename, self._process_document(filename)) for filename in remaining_files)
+            
+            context = "".join(
+                f"Content from file '{filename}':\n{file_contents[filename]}\n\n"
+                for filename in files_to_analyze
+                if file_contents[filename]
+            )
         
         # Determine specific task based on message content
         specific_task = self._determine_task(message.content)
@@ -226,12 +391,7 @@ If code is needed to process or visualize data, include it.
         
         try:
             # Generate response
-            if self.model_type.lower() == "gguf":
-                # Generate with GGUF model
-                response_text = self._generate_gguf(prompt)
-            else:
-                # Generate with HF model
-                response_text = self._generate_hf(prompt)
+            response_text = self._generate(prompt)
             
             # Check if response contains plots to generate
             plot_code = self._extract_plot_code(response_text)
@@ -271,6 +431,28 @@ If code is needed to process or visualize data, include it.
                 message_type="error"
             )
     
+    def update_history(self, message: Message) -> None:
+        """
+        Update conversation history with a new message
+
+        Args:
+            message: Message to add to history
+        """
+        super().update_history(message)
+        
+        # The prompt for this message covers the messages before it
+        self._history_text = "".join(self._history_formatted)
+        role = "User" if message.sender == "user" else "Assistant"
+        self._history_formatted.append(f"{role}: {message.content}\n\n")
+    
+    def clear_history(self) -> None:
+        """
+        Clear conversation history
+        """
+        super().clear_history()
+        self._history_formatted.clear()
+        self._history_text = ""
+    
     def get_prompt(self, message: Message, context: str = "", specific_task: str = "") -> str:
         """
         Generate prompt from message and conversation history
@@ -283,17 +465,11 @@ If code is needed to process or visualize data, include it.
         Returns:
             Complete prompt for the model
         """
-        # Format conversation history
-        history_text = ""
-        for i, hist_msg in enumerate(self.conversation_history[-self.max_history:-1]):
-            role = "User" if hist_msg["sender"] == "user" else "Assistant"
-            history_text += f"{role}: {hist_msg['content']}\n\n"
-        
-        # Format prompt
+        # Format prompt; the history text was already built by update_history()
         prompt = self.prompt_template.format(
             system_message=self.system_message,
             context=context,
-            conversation_history=history_text,
+            conversation_history=self._history_text,
             current_message=message.content,
             specific_task=specific_task
         )
@@ -310,31 +486,25 @@ If code is needed to process or visualize data, include it.
         Returns:
             Task description string
         """
-        content = message_content.lower()
-        
-        if any(word in content for word in ["analyze pdf", "extract from pdf", "read pdf"]):
-            return "Extract and analyze information from the provided PDF document."
-        
-        elif any(word in content for word in ["analyze image", "look at image", "what's in this image"]):
-            return "Analyze the provided image and extract relevant information."
-        
-        elif any(word in content for word in ["analyze spreadsheet", "excel data", "csv data"]):
-            return "Analyze the provided spreadsheet/CSV data and extract key insights."
-        
-        elif any(word in content for word in ["visualize", "create chart", "plot", "graph"]):
-            return "Create appropriate data visualizations based on the provided data."
-        
-        elif any(word in content for word in ["trend", "pattern", "correlation"]):
-            return "Identify trends, patterns, or correlations in the provided data."
-        
-        elif any(word in content for word in ["predict", "forecast", "projection"]):
-            return "Provide predictive analysis or forecasting based on historical data."
-        
-        elif any(word in content for word in ["summarize", "summary", "key points"]):
-            return "Summarize key findings and insights from the data."
-        
-        else:
-            return "Analyze the provided data or request and provide useful insights."
+        # The highest-priority task with any phrase in the message wins
+        priorities = [_TASK_PRIORITY[match.group(1)] for match in _TASK_RE.finditer(message_content.lower())]
+        if priorities:
+            return _TASKS[min(priorities)][1]
+        return _DEFAULT_TASK
+    
+    def _resolve_document_path(self, filename: str) -> str:
+        """
+        Resolve a document filename against the document directory
+
+        Args:
+            filename: Document filename or absolute path
+
+        Returns:
+            Full path to the document
+        """
+        if not os.path.isabs(filename):
+            return os.path.join(self.document_dir, filename)
+        return filename
     
     def _process_document(self, filename: str) -> str:
         """
@@ -346,23 +516,50 @@ If code is needed to process or visualize data, include it.
         Returns:
             Extracted text content
         """
-        # Get full path
-        if not os.path.isabs(filename):
-            file_path = os.path.join(self.document_dir, filename)
-        else:
-            file_path = filename
+        file_path = self._resolve_document_path(filename)
         
         # Check if file exists
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
             logger.warning(f"File not found: {file_path}")
             return f"ERROR: File '{filename}' not found."
         
+        key = (file_path, st.st_mtime_ns, st.st_size)
+        with self._doc_cache_lock:
+            cached = self._doc_cache.get(key)
+            if cached is not None:
+                self._doc_cache.move_to_end(key)
+                return cached
+        
+        content = self._read_document(filename, file_path)
+        
+        # Errors are not cached so that a fixed file or installed library is picked up
+        if self.document_cache_size > 0 and not content.startswith("ERROR:"):
+            with self._doc_cache_lock:
+                self._doc_cache[key] = content
+                if len(self._doc_cache) > self.document_cache_size:
+                    self._doc_cache.popitem(last=False)
+        
+        return content
+    
+    def _read_document(self, filename: str, file_path: str) -> str:
+        """
+        Extract the content of an existing document based on its file type
+
+        Args:
+            filename: Document filename as referenced in the message
+            file_path: Full path to the document
+
+        Returns:
+            Extracted text content
+        """
         # Process based on file extension
         file_ext = os.path.splitext(filename)[1].lower()
         
         try:
             # PDF file
-            if file_ext == '.pdf' and PDF_SUPPORT:
+            if file_ext == '.pdf' and (PDFIUM_SUPPORT or PDF_SUPPORT):
                 return self._extract_text_from_pdf(file_path)
             
             # Word document
@@ -404,36 +601,108 @@ If code is needed to process or visualize data, include it.
         Returns:
             Extracted text
         """
-        if not PDF_SUPPORT:
-            return "PDF processing is not available. Please install PyPDF2."
+        if not (PDFIUM_SUPPORT or PDF_SUPPORT):
+            return "PDF processing is not available. Please install pypdfium2 or PyPDF2."
+        
+        page_texts = self._extract_pdf_page_texts(file_path)
+        
+        # Pages with next to no text layer are likely scanned, so only those are OCR'd
+        text_lengths = [len("".join(page_text.split())) for page_text in page_texts]
+        scanned_pages = [page_num for page_num, length in enumerate(text_lengths) if length < 20]
+        if scanned_pages and (TESSEROCR_SUPPORT or PDF_SUPPORT):
+            logger.info(f"{len(scanned_pages)} page(s) without a text layer, trying OCR: {file_path}")
+            try:
+                for page_num, page_text in self._ocr_pdf_pages(file_path, scanned_pages).items():
+                    # Keep a short but genuine text layer unless OCR finds more
+                    if len("".join(page_text.split())) > text_lengths[page_num]:
+                        page_texts[page_num] = page_text
+            except Exception as e:
+                logger.error(f"OCR failed for PDF: {str(e)}")
+                if not any(text_lengths):
+                    return "This appears to be a scanned PDF. OCR processing failed."
+        
+        return "".join(
+            f"--- Page {page_num+1} ---\n{page_text}\n\n"
+            for page_num, page_text in enumerate(page_texts)
+        )
+    
+    def _ocr_pdf_pages(self, file_path: str, page_nums: List[int]) -> Dict[int, str]:
+        """
+        OCR selected pages of a PDF in parallel
+
+        Rendering (poppler) runs as a subprocess and OCR releases the GIL, so a
+        thread pool keeps them all busy.
+
+        Args:
+            file_path: Path to the PDF file
+            page_nums: Zero-based indexes of the pages to OCR
+
+        Returns:
+            OCR text keyed by page index
+        """
+        from pdf2image import convert_from_path
+        
+        def ocr_page(page_num: int) -> Tuple[int, str]:
+            images = convert_from_path(file_path, first_page=page_num + 1, last_page=page_num + 1)
+            return page_num, "".join(self._ocr_image(image) for image in images)
+        
+        with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, len(page_nums))) as executor:
+            return dict(executor.map(ocr_page, page_nums))
+    
+    def _extract_pdf_page_texts(self, file_path: str) -> List[str]:
+        """
+        Extract the text layer of each page of a PDF
+
+        Uses the native pdfium parser when available and PyPDF2 otherwise.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Returns:
+            Text of each page, in page order
+        """
+        if PDFIUM_SUPPORT:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                page_texts = []
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    page_texts.append(textpage.get_text_range())
+                    textpage.close()
+                    page.close()
+                return page_texts
+            finally:
+                pdf.close()
         
         with open(file_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            text = ""
-            
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += f"--- Page {page_num+1} ---\n"
-                text += page.extract_text()
-                text += "\n\n"
-            
-            # If no text was extracted, it might be a scanned PDF
-            if not text.strip():
-                logger.info(f"No text extracted from PDF, trying OCR: {file_path}")
-                # Try using OCR if available
-                if pytesseract:
-                    try:
-                        from pdf2image import convert_from_path
-                        images = convert_from_path(file_path)
-                        for i, image in enumerate(images):
-                            text += f"--- Page {i+1} ---\n"
-                            text += pytesseract.image_to_string(image)
-                            text += "\n\n"
-                    except Exception as e:
-                        logger.error(f"OCR failed for PDF: {str(e)}")
-                        text = "This appears to be a scanned PDF. OCR processing failed."
-            
-            return text
+            return [page.extract_text() for page in PyPDF2.PdfReader(f).pages]
+    
+    def _ocr_image(self, image) -> str:
+        """
+        OCR a single image
+
+        Uses a pooled tesserocr API when available, so the language model is loaded
+        once per handle rather than once per page; falls back to the tesseract CLI.
+
+        Args:
+            image: PIL image to read
+
+        Returns:
+            Recognized text
+        """
+        if not TESSEROCR_SUPPORT:
+            return pytesseract.image_to_string(image)
+        
+        # A handle is used by one thread at a time, so concurrent pages each take their own
+        try:
+            api = self._tess_apis.get_nowait()
+        except queue.Empty:
+            api = PyTessBaseAPI(lang='eng')
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            self._tess_apis.put(api)
     
     def _extract_text_from_docx(self, file_path: str) -> str:
         """
@@ -449,19 +718,15 @@ If code is needed to process or visualize data, include it.
             return "Word document processing is not available. Please install python-docx."
         
         doc = docx.Document(file_path)
-        text = ""
-        
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        parts = [para.text + "\n" for para in doc.paragraphs]
         
         # Extract tables if any
         for table in doc.tables:
-            text += "\n--- Table ---\n"
+            parts.append("\n--- Table ---\n")
             for row in table.rows:
-                row_text = [cell.text for cell in row.cells]
-                text += " | ".join(row_text) + "\n"
+                parts.append(" | ".join(cell.text for cell in row.cells) + "\n")
         
-        return text
+        return "".join(parts)
     
     def _extract_text_from_excel(self, file_path: str) -> str:
         """
@@ -477,34 +742,65 @@ If code is needed to process or visualize data, include it.
             return "Excel processing is not available. Please install openpyxl."
         
         # Read Excel file
-        df_dict = pd.read_excel(file_path, sheet_name=None)
-        text = ""
+        df_dict = pd.read_excel(file_path, sheet_name=None, engine=EXCEL_ENGINE)
+        parts = []
         
         # Process each sheet
         for sheet_name, df in df_dict.items():
-            text += f"--- Sheet: {sheet_name} ---\n"
+            parts.append(f"--- Sheet: {sheet_name} ---\n")
             
             # Get column headers
-            headers = df.columns.tolist()
-            text += "Columns: " + ", ".join([str(h) for h in headers]) + "\n\n"
+            parts.append("Columns: " + ", ".join(str(h) for h in df.columns) + "\n\n")
             
             # Basic statistics
-            text += "Basic Statistics:\n"
-            for col in df.columns:
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    text += f"- {col}:\n"
-                    text += f"  Mean: {df[col].mean():.2f}\n"
-                    text += f"  Median: {df[col].median():.2f}\n"
-                    text += f"  Min: {df[col].min():.2f}\n"
-                    text += f"  Max: {df[col].max():.2f}\n"
+            parts.append("Basic Statistics:\n" + self._format_numeric_stats(df))
             
             # First few rows as preview
-            text += "\nData Preview:\n"
-            text += df.head(10).to_string() + "\n"
-            
-            text += "\n"
+            parts.append("\nData Preview:\n" + self._format_preview(df.head(10)) + "\n\n")
         
-        return text
+        return "".join(parts)
+    
+    def _format_numeric_stats(self, df: pd.DataFrame) -> str:
+        """
+        Summarize the numeric columns of a DataFrame
+
+        Args:
+            df: DataFrame to summarize
+
+        Returns:
+            Mean, median, min and max of each numeric column
+        """
+        # Boolean columns count as numeric, as with pd.api.types.is_numeric_dtype
+        numeric = df.select_dtypes(include=['number', 'bool', 'boolean'])
+        if numeric.columns.empty:
+            return ""
+        
+        # One aggregation call computes every statistic for every column
+        stats = numeric.agg(['mean', 'median', 'min', 'max']).T
+        return "".join(
+            f"- {col}:\n"
+            f"  Mean: {mean:.2f}\n"
+            f"  Median: {median:.2f}\n"
+            f"  Min: {low:.2f}\n"
+            f"  Max: {high:.2f}\n"
+            for col, mean, median, low, high in stats.itertuples()
+        )
+    
+    def _format_preview(self, df: pd.DataFrame) -> str:
+        """
+        Render preview rows as tab-separated text
+
+        Args:
+            df: Rows to render
+
+        Returns:
+            Header line followed by one line per row
+        """
+        # Plain joins skip DataFrame.to_string()'s column-width and alignment pass,
+        # which the model does not need
+        lines = ["\t".join(map(str, df.columns))]
+        lines.extend("\t".join(map(str, row)) for row in df.itertuples(index=False, name=None))
+        return "\n".join(lines)
     
     def _extract_text_from_csv(self, file_path: str) -> str:
         """
@@ -518,26 +814,31 @@ If code is needed to process or visualize data, include it.
         """
         # Read CSV file
         try:
-            df = pd.read_csv(file_path)
+            if os.path.getsize(file_path) <= CSV_SINGLE_PASS_BYTES:
+                df = pd.read_csv(file_path, engine=CSV_ENGINE)
+                preview = df.head(10)
+            else:
+                # Only the preview rows and the numeric columns are needed, so skip
+                # converting everything else (the pyarrow engine has no nrows option).
+                # A column with text in the preview has text in the full file too, so
+                # the preview's numeric columns are the only candidates. Their dtypes
+                # come from the full read, with the same parser as the preview, and
+                # _format_numeric_stats drops any that turn out not to be numeric.
+                preview = pd.read_csv(file_path, nrows=10)
+                numeric_cols = preview.select_dtypes(include=['number', 'bool', 'boolean']).columns.tolist()
+                df = pd.read_csv(file_path, usecols=numeric_cols) if numeric_cols else preview
+            
             text = "--- CSV Data ---\n"
             
             # Get column headers
-            headers = df.columns.tolist()
-            text += "Columns: " + ", ".join([str(h) for h in headers]) + "\n\n"
+            text += "Columns: " + ", ".join(str(h) for h in preview.columns) + "\n\n"
             
             # Basic statistics
-            text += "Basic Statistics:\n"
-            for col in df.columns:
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    text += f"- {col}:\n"
-                    text += f"  Mean: {df[col].mean():.2f}\n"
-                    text += f"  Median: {df[col].median():.2f}\n"
-                    text += f"  Min: {df[col].min():.2f}\n"
-                    text += f"  Max: {df[col].max():.2f}\n"
+            text += "Basic Statistics:\n" + self._format_numeric_stats(df)
             
             # First few rows as preview
             text += "\nData Preview:\n"
-            text += df.head(10).to_string() + "\n"
+            text += self._format_preview(preview) + "\n"
             
             return text
             
@@ -568,43 +869,86 @@ If code is needed to process or visualize data, include it.
         Returns:
             Analysis text
         """
+        return self._analyze_images_batch([file_path])[0]
+    
+    def _analyze_images_batch(self, file_paths: List[str]) -> List[str]:
+        """
+        Analyze several images with one batched vision model call
+
+        Args:
+            file_paths: Paths to the image files
+
+        Returns:
+            Analysis text for each image, in order
+        """
         if not self.use_vision_model or self.vision_model is None:
-            return "Vision model is not available for image analysis."
+            return ["Vision model is not available for image analysis."] * len(file_paths)
         
         try:
-            # Open image
-            image = Image.open(file_path)
+            # Open images
+            images = [Image.open(file_path).convert('RGB') for file_path in file_paths]
             
-            # Generate prompt
-            prompt = "Describe this image in detail, focusing on business-relevant information."
-            
-            # Process image
-            inputs = self.vision_processor(text=prompt, images=image, return_tensors="pt").to(self.vision_model.device)
+            # Process images; floating-point inputs are cast to the model's dtype (bf16 where supported)
+            inputs = self.vision_processor(
+                text=[_VISION_PROMPT] * len(images), images=images, return_tensors="pt", padding=True
+            ).to(self.vision_model.device, dtype=self.vision_model.dtype)
             
             # Generate
-            import torch
             try:
-                with torch.no_grad():
+                with torch.inference_mode():
                     outputs = self.vision_model.generate(
                         **inputs,
                         max_new_tokens=500,
-                        do_sample=False
+                        do_sample=False,
+                        use_cache=True
                     )
-                
-                    # Decode within the torch.no_grad() block
-                    generated_text = self.vision_processor.batch_decode(outputs, skip_special_tokens=True)[0]
+                    generated_texts = self.vision_processor.batch_decode(outputs, skip_special_tokens=True)
             except Exception as e:
                 logger.error(f"Error generating vision model output: {str(e)}")
-                return f"ERROR: Failed to analyze image with vision model: {str(e)}"
+                return [f"ERROR: Failed to analyze image with vision model: {str(e)}"] * len(file_paths)
             
             # Remove prompt from response
-            result = generated_text.replace(prompt, "").strip()
-            
-            return f"IMAGE ANALYSIS:\n{result}"
+            return [
+                f"IMAGE ANALYSIS:\n{generated_text.replace(_VISION_PROMPT, '').strip()}"
+                for generated_text in generated_texts
+            ]
             
         except Exception as e:
             logger.error(f"Error analyzing image: {str(e)}")
-            return f"ERROR: Could not analyze image: {str(e)}"
+            return [f"ERROR: Could not analyze image: {str(e)}"] * len(file_paths)
+    
+    def _generate(self, prompt: str) -> str:
+        """
+        Generate text with the agent's model, reusing cached responses
+
+        Only deterministic generation (temperature 0) is cached, so sampled
+        responses stay fresh on every call.
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            Generated text
+        """
+        cacheable = self.temperature == 0 and self.response_cache_size > 0
+        if cacheable:
+            key = hashlib.blake2b(prompt.encode(), digest_size=16).digest()
+            cached = self._response_cache.get(key)
+            if cached is not None:
+                self._response_cache.move_to_end(key)
+                return cached
+        
+        if self.model_type.lower() == "gguf":
+            response = self._generate_gguf(prompt)
+        else:
+            response = self._generate_hf(prompt)
+        
+        if cacheable:
+            self._response_cache[key] = response
+            if len(self._response_cache) > self.response_cache_size:
+                self._response_cache.popitem(last=False)
+        
+        return response
     
     def _generate_gguf(self, prompt: str) -> str:
         """
@@ -625,14 +969,14 @@ If code is needed to process or visualize data, include it.
                 "stop": ["User:", "\n\nUser:"]
             }
             
-            # Generate
-            result = self.model(prompt, **params)
+            # Generate; llama.cpp skips re-evaluating the prefix shared with earlier prompts
+            result = self.model.create_completion(prompt, **params)
             
             # Extract and clean response
             response = result["choices"][0]["text"].strip()
             
             # Remove any leading "Assistant:" if present
-            response = re.sub(r"^Assistant:\s*", "", response)
+            response = _ASSISTANT_PREFIX_RE.sub("", response)
             
             return response
         except Exception as e:
@@ -649,21 +993,21 @@ If code is needed to process or visualize data, include it.
         Returns:
             Generated text
         """
-        import torch
-        
         try:
-            # Tokenize
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+            # Tokenize; non-blocking copies let the host-to-device transfer overlap with setup
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+            inputs = {name: tensor.to(self.model.device, non_blocking=True) for name, tensor in inputs.items()}
             
             # Generate
-            with torch.no_grad():
+            with torch.inference_mode():
                 outputs = self.model.generate(
-                    inputs.input_ids,
+                    **inputs,
                     max_new_tokens=2048,
                     temperature=self.temperature,
                     top_p=self.top_p,
-                    do_sample=True,
+                    do_sample=self.temperature > 0,
                     pad_token_id=self.tokenizer.eos_token_id,
+                    use_cache=True,
                 )
             
             # Decode
@@ -673,7 +1017,7 @@ If code is needed to process or visualize data, include it.
             response = full_response[len(prompt):].strip()
             
             # Remove any leading "Assistant:" if present
-            response = re.sub(r"^Assistant:\s*", "", response)
+            response = _ASSISTANT_PREFIX_RE.sub("", response)
             
             return response
         except Exception as e:
@@ -694,15 +1038,12 @@ If code is needed to process or visualize data, include it.
         plot_code_blocks = []
         
         # Find all code blocks
-        code_blocks = re.findall(r'```python(.*?)```', response, re.DOTALL)
+        code_blocks = _PY_BLOCK_RE.findall(response)
         
         # Check each code block for plotting functions
         for code in code_blocks:
-            if ('plt.' in code or 'matplotlib' in code or 'sns.' in code or '.plot(' in code) and not 'plt.savefig' in code:
-                # Add plt.savefig to save the plot
-                if not code.strip().endswith('\n'):
-                    code += '\n'
-                code += '\nplt.savefig("temp_plot.png")\nplt.close()'
+            if _PLOT_HINT_RE.search(code) and not _SAVEFIG_RE.search(code):
+                # The figure is captured by _execute_plot_code after the block runs
                 plot_code_blocks.append(code)
         
         return plot_code_blocks
@@ -718,45 +1059,64 @@ If code is needed to process or visualize data, include it.
             List of base64-encoded plot images
         """
         plot_images = []
+        plot_globals = self._get_plot_globals()
         
-        for i, code in enumerate(code_blocks):
-            # Create a temporary directory to save plots
-            with tempfile.TemporaryDirectory() as temp_dir:
-                plot_file = os.path.join(temp_dir, "temp_plot.png")
-                
-                # Create a new Python file with the code
-                temp_code_file = os.path.join(temp_dir, f"plot_code_{i}.py")
-                with open(temp_code_file, 'w') as f:
-                    # Add necessary imports if not present
-                    imports = ""
-                    if 'import matplotlib.pyplot as plt' not in code:
-                        imports += "import matplotlib.pyplot as plt\n"
-                    if 'import numpy as np' not in code and 'np.' in code:
-                        imports += "import numpy as np\n"
-                    if 'import pandas as pd' not in code and 'pd.' in code:
-                        imports += "import pandas as pd\n"
-                    if 'import seaborn as sns' not in code and 'sns.' in code:
-                        imports += "import seaborn as sns\n"
-                    
-                    f.write(imports + code)
-                
-                # Execute the code
-                try:
-                    exec_globals = {}
-                    with open(temp_code_file, 'r') as f:
-                        exec(f.read(), exec_globals)
-                    
-                    # Check if the plot was generated
-                    if os.path.exists(plot_file):
-                        # Read the image and encode as base64
-                        with open(plot_file, 'rb') as f:
-                            encoded_image = base64.b64encode(f.read()).decode('utf-8')
-                            plot_images.append(encoded_image)
-                except Exception as e:
-                    logger.error(f"Error executing plot code: {str(e)}")
+        for code in code_blocks:
+            # Run in-process with the plotting modules preloaded, then capture the
+            # current figure straight into memory
+            try:
+                plt.close('all')
+                exec(self._compile_plot_code(code), dict(plot_globals))
+                if plt.get_fignums():
+                    buffer = BytesIO()
+                    plt.gcf().savefig(buffer, format='png')
+                    plot_images.append(base64.b64encode(buffer.getvalue()).decode('utf-8'))
+            except Exception as e:
+                logger.error(f"Error executing plot code: {str(e)}")
+            finally:
+                plt.close('all')
         
         return plot_images
     
+    def _compile_plot_code(self, code: str) -> Any:
+        """
+        Compile a plot code block, reusing the code object for repeated blocks
+
+        Args:
+            code: Python source of the block
+
+        Returns:
+            Compiled code object
+        """
+        key = hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest()
+        compiled = self._code_cache.get(key)
+        if compiled is not None:
+            self._code_cache.move_to_end(key)
+            return compiled
+        
+        compiled = compile(code, f"<plot_{key.hex()[:16]}>", 'exec')
+        self._code_cache[key] = compiled
+        if len(self._code_cache) > 128:
+            self._code_cache.popitem(last=False)
+        return compiled
+    
+    def _get_plot_globals(self) -> Dict[str, Any]:
+        """
+        Get the globals that plot code runs with, importing seaborn on first use
+
+        Returns:
+            Mapping of the usual plotting aliases to their modules
+        """
+        if self._plot_globals is None:
+            plot_globals = {"plt": plt, "np": np, "pd": pd}
+            try:
+                import seaborn as sns
+                plot_globals["sns"] = sns
+            except ImportError:
+                pass
+            self._plot_globals = plot_globals
+        return self._plot_globals
+    
     def _add_plot_images_to_response(self, response: str, plot_images: List[str]) -> str:
         """
         Add plot images to the response
@@ -768,23 +1128,19 @@ If code is needed to process or visualize data, include it.
         Returns:
             Updated response with images
         """
-        # Replace code blocks with code + image
-        code_blocks = re.findall(r'```python(.*?)```', response, re.DOTALL)
-        
-        updated_response = response
+        # Follow each code block with its image, building the result in one pass
+        parts = []
+        last_end = 0
         
-        for i, code in enumerate(code_blocks):
-            if i < len(plot_images):
-                # Create image markdown
-                image_markdown = f'\n\n![Generated Plot {i+1}](data:image/png;base64,{plot_images[i]})\n\n'
-                
-                # Replace code block with code block + image
-                code_block = f'```python{code}```'
-                replacement = f'{code_block}{image_markdown}'
-                
-                updated_response = updated_response.replace(code_block, replacement, 1)
+        for i, block in enumerate(_PY_BLOCK_RE.finditer(response)):
+            if i >= len(plot_images):
+                break
+            parts.append(response[last_end:block.end()])
+            parts.append(f'\n\n![Generated Plot {i+1}](data:image/png;base64,{plot_images[i]})\n\n')
+            last_end = block.end()
         
-        return updated_response
+        parts.append(response[last_end:])
+        return "".join(parts)
     
     def analyze_document(self, document_path: str) -> str:
         """
@@ -810,10 +1166,24 @@ If code is needed to process or visualize data, include it.
             Analysis result
         """
         try:
+            # Reuse an earlier analysis of the same data. A DataFrame is matched by identity,
+            # shape, columns and dtypes, so one modified in place without changing those
+            # must be passed as a copy to be re-analyzed.
+            if isinstance(data, str):
+                cache_key = ("text", hashlib.blake2b(f"{data_type.lower()}\0{data}".encode('utf-8'), digest_size=16).digest())
+                frame_ref = None
+            else:
+                cache_key = ("frame", id(data), data.shape, tuple(data.columns), tuple(data.dtypes))
+                frame_ref = weakref.ref(data)
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None and (cached[0] is None or cached[0]() is data):
+                self._analysis_cache.move_to_end(cache_key)
+                return cached[1]
+            
             # Convert string data to DataFrame if needed
             if isinstance(data, str):
                 if data_type.lower() == "csv":
-                    df = pd.read_csv(pd.StringIO(data))
+                    df = pd.read_csv(StringIO(data), engine=CSV_ENGINE)
                 elif data_type.lower() == "json":
                     df = pd.read_json(data)
                 else:
@@ -822,53 +1192,146 @@ If code is needed to process or visualize data, include it.
                 df = data
             
             # Generate analysis
-            analysis = "--- Data Analysis ---\n"
+            parts = ["--- Data Analysis ---\n"]
             
             # Basic info
-            analysis += f"Dimensions: {df.shape[0]} rows x {df.shape[1]} columns\n"
-            analysis += f"Columns: {', '.join(df.columns.tolist())}\n\n"
+            parts.append(f"Dimensions: {df.shape[0]} rows x {df.shape[1]} columns\n")
+            parts.append(f"Columns: {', '.join(df.columns.tolist())}\n\n")
             
             # Data types
-            analysis += "Data Types:\n"
-            for col, dtype in df.dtypes.items():
-                analysis += f"- {col}: {dtype}\n"
-            analysis += "\n"
+            parts.append("Data Types:\n")
+            parts.extend(f"- {col}: {dtype}\n" for col, dtype in df.dtypes.items())
+            parts.append("\n")
             
-            # Basic statistics for numeric columns
+            # Column statistics, missing counts and top categorical values
             numeric_cols = df.select_dtypes(include=[np.number]).columns
+            cat_cols = df.select_dtypes(include=['object', 'category']).columns
+            stats, missing, top_values = self._summarize_columns(df, numeric_cols, cat_cols)
+            
+            # Basic statistics for numeric columns
             if len(numeric_cols) > 0:
-                analysis += "Numeric Column Statistics:\n"
-                for col in numeric_cols:
-                    analysis += f"- {col}:\n"
-                    analysis += f"  Mean: {df[col].mean():.2f}\n"
-                    analysis += f"  Median: {df[col].median():.2f}\n"
-                    analysis += f"  Std Dev: {df[col].std():.2f}\n"
-                    analysis += f"  Min: {df[col].min():.2f}\n"
-                    analysis += f"  Max: {df[col].max():.2f}\n"
-                analysis += "\n"
+                parts.append("Numeric Column Statistics:\n")
+                parts.extend(
+                    f"- {col}:\n"
+                    f"  Mean: {mean:.2f}\n"
+                    f"  Median: {median:.2f}\n"
+                    f"  Std Dev: {std:.2f}\n"
+                    f"  Min: {low:.2f}\n"
+                    f"  Max: {high:.2f}\n"
+                    for col, mean, median, std, low, high in stats.itertuples()
+                )
+                parts.append("\n")
             
             # Missing values
-            missing = df.isnull().sum()
             if missing.sum() > 0:
-                analysis += "Missing Values:\n"
-                for col, count in missing.items():
-                    if count > 0:
-                        analysis += f"- {col}: {count} ({count/df.shape[0]*100:.1f}%)\n"
-                analysis += "\n"
+                parts.append("Missing Values:\n")
+                parts.extend(
+                    f"- {col}: {count} ({count/df.shape[0]*100:.1f}%)\n"
+                    for col, count in missing.items()
+                    if count > 0
+                )
+                parts.append("\n")
             
             # Categorical columns
-            cat_cols = df.select_dtypes(include=['object', 'category']).columns
             if len(cat_cols) > 0:
-                analysis += "Categorical Variables:\n"
+                parts.append("Categorical Variables:\n")
                 for col in cat_cols:
-                    value_counts = df[col].value_counts().head(5)
-                    analysis += f"- {col} (top 5):\n"
-                    for val, count in value_counts.items():
-                        analysis += f"  {val}: {count} ({count/df.shape[0]*100:.1f}%)\n"
-                analysis += "\n"
+                    parts.append(f"- {col} (top 5):\n")
+                    parts.extend(
+                        f"  {val}: {count} ({count/df.shape[0]*100:.1f}%)\n"
+                        for val, count in top_values[col]
+                    )
+                parts.append("\n")
             
             # Data preview
-            analysis += "Data Preview (first 5 rows):\n"
-            analysis += df.head(5).to_string() + "\n"
+            parts.append("Data Preview (first 5 rows):\n")
+            parts.append(df.head(5).to_string() + "\n")
+            
+            analysis = "".join(parts)
+            self._analysis_cache[cache_key] = (frame_ref, analysis)
+            if len(self._analysis_cache) > 32:
+                self._analysis_cache.popitem(last=False)
             
             return analysis
+            
+        except Exception as e:
+            logger.error(f"Error analyzing data: {str(e)}")
+            return f"ERROR: Could not analyze data: {str(e)}"
+    
+    def _summarize_columns(self, df: pd.DataFrame, numeric_cols: pd.Index,
+                           cat_cols: pd.Index) -> Tuple[pd.DataFrame, pd.Series, Dict[Any, List[Tuple[Any, int]]]]:
+        """
+        Compute the per-column summaries used by analyze_data
+
+        Args:
+            df: DataFrame to summarize
+            numeric_cols: Numeric columns to compute statistics for
+            cat_cols: Categorical columns to count values for
+
+        Returns:
+            Tuple of (mean/median/std/min/max per numeric column, missing count per column,
+            top 5 (value, count) pairs per categorical column)
+        """
+        if POLARS_SUPPORT:
+            try:
+                return self._summarize_columns_polars(df, numeric_cols, cat_cols)
+            except Exception as e:
+                # e.g. non-string column names or mixed-type object columns
+                logger.debug(f"Falling back to pandas for column summaries: {str(e)}")
+        
+        stat_names = ['mean', 'median', 'std', 'min', 'max']
+        if len(numeric_cols) > 0:
+            stats = df[numeric_cols].agg(stat_names).T
+        else:
+            # agg() has nothing to concatenate without columns
+            stats = pd.DataFrame(columns=stat_names, dtype=float)
+        missing = df.isnull().sum()
+        
+        # Count every categorical column in one hash aggregation over the melted values,
+        # then keep the five most frequent values of each (ties in first-seen order)
+        top_values = {col: [] for col in cat_cols}
+        if len(cat_cols) > 0:
+            counts = (
+                df[cat_cols]
+                .melt(var_name='__column__', value_name='__value__')
+                .groupby(['__column__', '__value__'], sort=False, observed=True)
+                .size()
+                .sort_values(ascending=False, kind='stable')
+            )
+            for (col, val), count in counts.groupby(level=0, sort=False).head(5).items():
+                top_values[col].append((val, count))
+        return stats, missing, top_values
+    
+    def _summarize_columns_polars(self, df: pd.DataFrame, numeric_cols: pd.Index,
+                                  cat_cols: pd.Index) -> Tuple[pd.DataFrame, pd.Series, Dict[Any, List[Tuple[Any, int]]]]:
+        """
+        Compute the column summaries with one Polars query, which evaluates every
+        aggregation in a single multi-threaded pass over the data
+
+        Args:
+            df: DataFrame to summarize
+            numeric_cols: Numeric columns to compute statistics for
+            cat_cols: Categorical columns to count values for
+
+        Returns:
+            Same as _summarize_columns
+        """
+        stat_names = ('mean', 'median', 'std', 'min', 'max')
+        exprs = [pl.col(col).null_count().alias(f"missing_{i}") for i, col in enumerate(df.columns)]
+        for i, col in enumerate(numeric_cols):
+            exprs.extend(getattr(pl.col(col), name)().cast(pl.Float64).alias(f"{name}_{i}") for name in stat_names)
+        for i, col in enumerate(cat_cols):
+            exprs.append(pl.col(col).drop_nulls().value_counts(sort=True).head(5).implode().alias(f"top_{i}"))
+        
+        row = pl.from_pandas(df).lazy().select(exprs).collect().row(0, named=True)
+        
+        stats = pd.DataFrame(
+            [[row[f"{name}_{i}"] for name in stat_names] for i in range(len(numeric_cols))],
+            index=numeric_cols, columns=list(stat_names), dtype=float
+        )
+        missing = pd.Series([row[f"missing_{i}"] for i in range(len(df.columns))], index=df.columns)
+        top_values = {
+            col: [(entry[col], entry["count"]) for entry in row[f"top_{i}"]]
+            for i, col in enumerate(cat_cols)
+        }
+        return stats, missing, top_values
@@ -6,13 +6,21 @@ client communications, outreach tracking, and relationship management.
 """
 
 import os
-import json
+import heapq
 import logging
 import time
-from typing import Dict, List, Any, Optional, Tuple, Union
+import uuid
+from collections import deque
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
 import re
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+    import json
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +39,65 @@ except ImportError:
     from core.coordinator import Agent, Message
     from core.model_loader import ModelLoader
 
+# Regular expressions used on every response, compiled once at import
+# Known actions capture their three fields, which may be padded or empty; the last may
+# contain colons (times, URLs).
+# Any other directive is matched too, so that it is still removed from the text.
+_ACTION_RE = re.compile(
+    r"\[ACTION:\s*(?:(SAVE_CLIENT|SCHEDULE_FOLLOWUP|LOG_INTERACTION)\s*:([^:\]]*):([^:\]]*):([^\]]*)|[^\]]+)\]"
+)
+_ASSISTANT_PREFIX_RE = re.compile(r"^Assistant:\s*")
+
+# Tasks in priority order; a task applies when the message contains a phrase from
+# each of its phrase groups
+_TASKS = (
+    ((("draft",), ("email", "message")),
+     "Draft a professional email or message based on the provided information."),
+    ((("template", "create template"),),
+     "Create a reusable communication template for the specified scenario."),
+    ((("follow-up", "follow up", "followup"),),
+     "Suggest an appropriate follow-up action or message."),
+    ((("schedule", "meeting", "appointment"),),
+     "Help with scheduling or creating a meeting invitation."),
+    ((("track", "interaction", "status"),),
+     "Track or report on client interactions and status."),
+    ((("analyze", "pattern", "response"),),
+     "Analyze communication patterns or client responses."),
+)
+_DEFAULT_TASK = "Provide assistance with client communication or outreach tasks."
+# One scan finds every trigger phrase; the lookahead keeps overlapping phrases visible
+_TASK_RE = re.compile("(?=({}))".format("|".join(
+    map(re.escape, dict.fromkeys(phrase for groups, _ in _TASKS for group in groups for phrase in group))
+)))
+
+# Reserved key holding the snapshot's generation id alongside the client entries
+_GENERATION_KEY = "__generation__"
+
+
+def _dump_json(data: Any, indent: bool = False) -> bytes:
+    """
+    Serialize data as JSON bytes, 2-space indented if requested
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, indent=2 if indent else None).encode('utf-8')
+
+
+def _load_json(data: bytes) -> Any:
+    """
+    Parse JSON bytes
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _trigrams(text: str) -> Set[str]:
+    """
+    Get the distinct three-character substrings of a text
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
 
 class OutreachAgent(Agent):
     """
@@ -81,14 +148,39 @@ Always respect privacy and confidentiality of client information.
 Respond with a professional, helpful solution that addresses the request.
 """
         
-        # Setup client database path
+        # Setup client database paths: a JSON snapshot, plus an append-only log of the
+        # changes made since it that compact() folds back into the snapshot
         self.clients_db_path = os.path.join(os.getcwd(), "data", "clients.json")
+        self.clients_log_path = os.path.join(os.getcwd(), "data", "clients.jsonl")
+        self.compact_log_bytes = kwargs.get("compact_log_bytes", 1024 * 1024)
+        # Id of the current snapshot, stored in it and in the log header; a new one
+        # is drawn on every compaction
+        self._generation: Optional[str] = None
         
         # Load client data if exists
         self.clients = self._load_clients()
         
+        # Trigram index over each client's searchable text, built on the first search.
+        # Any substring query of 3+ characters only needs to check clients that contain
+        # all of its trigrams.
+        self._search_index: Optional[Dict[str, Set[str]]] = None
+        self._search_texts: Dict[str, str] = {}
+        self._search_order: Dict[str, int] = {}
+        
+        # Min-heap of (date, sequence, client name, follow-up) for pending follow-ups.
+        # ISO dates sort lexicographically, so due entries are found without parsing them.
+        self._followup_heap: List[Tuple[str, int, str, Dict[str, Any]]] = []
+        self._followup_seq = 0
+        for client_name, client_data in self.clients.items():
+            for followup in client_data.get("followups", []):
+                self._push_followup(client_name, followup)
+        
         # Configure from kwargs
         self.max_history = kwargs.get("max_history", 10)
+        # Formatted history, maintained incrementally by update_history(): the most recent
+        # messages before the current one, and their joined text for the next prompt
+        self._history_formatted = deque(maxlen=max(self.max_history - 1, 0))
+        self._history_text = ""
         self.context_length = kwargs.get("context_length", 2048)
         self.temperature = kwargs.get("temperature", 0.7)
         self.top_p = kwargs.get("top_p", 0.9)
@@ -183,6 +275,28 @@ Respond with a professional, helpful solution that addresses the request.
                 message_type="error"
             )
     
+    def update_history(self, message: Message) -> None:
+        """
+        Update conversation history with a new message
+
+        Args:
+            message: Message to add to history
+        """
+        super().update_history(message)
+        
+        # The prompt for this message covers the messages before it
+        self._history_text = "".join(self._history_formatted)
+        role = "User" if message.sender == "user" else "Assistant"
+        self._history_formatted.append(f"{role}: {message.content}\n\n")
+    
+    def clear_history(self) -> None:
+        """
+        Clear conversation history
+        """
+        super().clear_history()
+        self._history_formatted.clear()
+        self._history_text = ""
+    
     def get_prompt(self, message: Message, specific_task: str = "") -> str:
         """
         Generate prompt from message and conversation history
@@ -194,16 +308,10 @@ Respond with a professional, helpful solution that addresses the request.
         Returns:
             Complete prompt for the model
         """
-        # Format conversation history
-        history_text = ""
-        for i, hist_msg in enumerate(self.conversation_history[-self.max_history:-1]):
-            role = "User" if hist_msg["sender"] == "user" else "Assistant"
-            history_text += f"{role}: {hist_msg['content']}\n\n"
-        
-        # Format prompt
+        # Format prompt; the history text was already built by update_history()
         prompt = self.prompt_template.format(
             system_message=self.system_message,
-            conversation_history=history_text,
+            conversation_history=self._history_text,
             current_message=message.content,
             specific_task=specific_task
         )
@@ -220,28 +328,13 @@ Respond with a professional, helpful solution that addresses the request.
         Returns:
             Task description string
         """
-        content = message_content.lower()
-        
-        if "draft" in content and any(word in content for word in ["email", "message"]):
-            return "Draft a professional email or message based on the provided information."
-        
-        elif any(word in content for word in ["template", "create template"]):
-            return "Create a reusable communication template for the specified scenario."
-        
-        elif any(word in content for word in ["follow-up", "follow up", "followup"]):
-            return "Suggest an appropriate follow-up action or message."
+        found = {match.group(1) for match in _TASK_RE.finditer(message_content.lower())}
         
-        elif any(word in content for word in ["schedule", "meeting", "appointment"]):
-            return "Help with scheduling or creating a meeting invitation."
-        
-        elif any(word in content for word in ["track", "interaction", "status"]):
-            return "Track or report on client interactions and status."
-        
-        elif any(word in content for word in ["analyze", "pattern", "response"]):
-            return "Analyze communication patterns or client responses."
-        
-        else:
-            return "Provide assistance with client communication or outreach tasks."
+        # The highest-priority task whose phrase groups all matched wins
+        for groups, description in _TASKS:
+            if all(found.intersection(group) for group in groups):
+                return description
+        return _DEFAULT_TASK
     
     def _generate_gguf(self, prompt: str) -> str:
         """
@@ -268,7 +361,7 @@ Respond with a professional, helpful solution that addresses the request.
         response = result["choices"][0]["text"].strip()
         
         # Remove any leading "Assistant:" if present
-        response = re.sub(r"^Assistant:\s*", "", response)
+        response = _ASSISTANT_PREFIX_RE.sub("", response)
         
         return response
     
@@ -305,7 +398,7 @@ Respond with a professional, helpful solution that addresses the request.
         response = full_response[len(prompt):].strip()
         
         # Remove any leading "Assistant:" if present
-        response = re.sub(r"^Assistant:\s*", "", response)
+        response = _ASSISTANT_PREFIX_RE.sub("", response)
         
         return response
     
@@ -321,94 +414,173 @@ Respond with a professional, helpful solution that addresses the request.
             Tuple of (processed_text, list_of_actions_taken)
         """
         actions_taken = []
-        processed_text = response_text
-        
-        # Look for action directives
-        action_matches = re.findall(r"\[ACTION:([^\]]+)\]", response_text)
-        
-        for action in action_matches:
-            action = action.strip()
+        text_parts = []
+        last_end = 0
+        
+        # Look for action directives, keeping the text around them in the same pass
+        for match in _ACTION_RE.finditer(response_text):
+            text_parts.append(response_text[last_end:match.start()])
+            last_end = match.end()
+            action, first, second, rest = match.groups()
             
             # Process based on action type
-            if action.startswith("SAVE_CLIENT"):
+            if action == "SAVE_CLIENT":
                 # Format: SAVE_CLIENT:name:email:status
-                parts = action.split(":")
-                if len(parts) >= 4:
-                    client_name = parts[1].strip()
-                    client_email = parts[2].strip()
-                    client_status = parts[3].strip()
-                    
-                    # Save client info
-                    self._save_client(client_name, client_email, client_status)
-                    
-                    actions_taken.append({
-                        "type": "save_client",
-                        "client": client_name,
-                        "email": client_email,
-                        "status": client_status
-                    })
+                client_name = first.strip()
+                client_email = second.strip()
+                client_status = rest.strip()
+                
+                # Save client info
+                self._save_client(client_name, client_email, client_status)
+                
+                actions_taken.append({
+                    "type": "save_client",
+                    "client": client_name,
+                    "email": client_email,
+                    "status": client_status
+                })
             
-            elif action.startswith("SCHEDULE_FOLLOWUP"):
+            elif action == "SCHEDULE_FOLLOWUP":
                 # Format: SCHEDULE_FOLLOWUP:client:days:type
-                parts = action.split(":")
-                if len(parts) >= 4:
-                    client_name = parts[1].strip()
-                    days = int(parts[2].strip())
-                    followup_type = parts[3].strip()
-                    
-                    # Schedule follow-up
-                    self._schedule_followup(client_name, days, followup_type)
-                    
-                    actions_taken.append({
-                        "type": "schedule_followup",
-                        "client": client_name,
-                        "days": days,
-                        "followup_type": followup_type
-                    })
+                client_name = first.strip()
+                days = int(second.strip())
+                followup_type = rest.strip()
+                
+                # Schedule follow-up
+                self._schedule_followup(client_name, days, followup_type)
+                
+                actions_taken.append({
+                    "type": "schedule_followup",
+                    "client": client_name,
+                    "days": days,
+                    "followup_type": followup_type
+                })
             
-            elif action.startswith("LOG_INTERACTION"):
+            elif action == "LOG_INTERACTION":
                 # Format: LOG_INTERACTION:client:type:summary
-                parts = action.split(":")
-                if len(parts) >= 4:
-                    client_name = parts[1].strip()
-                    interaction_type = parts[2].strip()
-                    summary = ":".join(parts[3:]).strip()  # Join back in case summary contains ":"
-                    
-                    # Log interaction
-                    self._log_interaction(client_name, interaction_type, summary)
-                    
-                    actions_taken.append({
-                        "type": "log_interaction",
-                        "client": client_name,
-                        "interaction_type": interaction_type,
-                        "summary": summary
-                    })
-        
-        # Remove action directives from response
-        processed_text = re.sub(r"\[ACTION:[^\]]+\]", "", processed_text).strip()
+                client_name = first.strip()
+                interaction_type = second.strip()
+                summary = rest.strip()
+                
+                # Log interaction
+                self._log_interaction(client_name, interaction_type, summary)
+                
+                actions_taken.append({
+                    "type": "log_interaction",
+                    "client": client_name,
+                    "interaction_type": interaction_type,
+                    "summary": summary
+                })
+        
+        # Response without the action directives
+        text_parts.append(response_text[last_end:])
+        processed_text = "".join(text_parts).strip()
         
         return processed_text, actions_taken
     
     def _load_clients(self) -> Dict[str, Dict[str, Any]]:
         """
-        Load client data from file
+        Load client data from the snapshot and replay the change log on top of it
 
         Returns:
             Dictionary of client data
         """
+        clients = {}
         if os.path.exists(self.clients_db_path):
             try:
-                with open(self.clients_db_path, 'r') as f:
-                    return json.load(f)
+                with open(self.clients_db_path, 'rb') as f:
+                    clients = _load_json(f.read())
+                self._generation = clients.pop(_GENERATION_KEY, None)
             except Exception as e:
                 logger.error(f"Error loading client data: {str(e)}")
+                
+                # Return empty dict if error
+                return {}
+        
+        if os.path.exists(self.clients_log_path):
+            try:
+                with open(self.clients_log_path, 'rb+') as f:
+                    data = f.read()
+                    # Drop a last line cut short by an interrupted write, so new
+                    # changes are not appended onto it
+                    if not data.endswith(b"\n"):
+                        data = data[:data.rfind(b"\n") + 1]
+                        f.truncate(len(data))
+                lines = data.splitlines()
+                header = _load_json(lines[0]) if lines else {}
+            except Exception as e:
+                logger.error(f"Error loading client change log: {str(e)}")
+                return clients
+            
+            # The header names the snapshot the log applies to. A log from before the last
+            # compaction (left by a crash mid-compaction) is already part of the snapshot.
+            if header.get("generation") != self._generation:
+                logger.warning("Discarding client change log that does not match the snapshot")
+                self._reset_log()
+                return clients
+            
+            replay_errors = 0
+            for line_number, line in enumerate(lines[1:], 2):
+                try:
+                    self._apply_event(clients, _load_json(line))
+                except Exception as e:
+                    replay_errors += 1
+                    logger.error(f"Error replaying line {line_number} of the client change log: {str(e)}")
+            
+            if replay_errors:
+                # Fold what was recovered into a new snapshot. Appending after the bad
+                # lines would leave them in place, failing every later load.
+                self.clients = clients
+                self.compact()
+        
+        return clients
+    
+    def _apply_event(self, clients: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> None:
+        """
+        Apply a logged change to client data
+
+        Args:
+            clients: Client data to update
+            event: Change with the client name, fields to set and list items to append
+        """
+        client = clients.setdefault(event["client"], {})
+        client.update(event.get("set", {}))
+        for key, item in event.get("append", {}).items():
+            client.setdefault(key, []).append(item)
+    
+    def _record_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply a change to the client data and append it to the change log
+
+        Args:
+            event: Change with the client name, fields to set and list items to append
+
+        Returns:
+            True if successful, False otherwise
+        """
+        line = _dump_json(event) + b"\n"
+        self._apply_event(self.clients, event)
+        
+        try:
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(self.clients_log_path), exist_ok=True)
+            
+            with open(self.clients_log_path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(_dump_json({"generation": self._generation}) + b"\n")
+                f.write(line)
+                log_size = f.tell()
+        except Exception as e:
+            logger.error(f"Error saving client data: {str(e)}")
+            return False
         
-        # Return empty dict if no data or error
-        return {}
+        if log_size > self.compact_log_bytes:
+            return self.compact()
+        return True
     
-    def _save_clients(self) -> bool:
+    def compact(self) -> bool:
         """
-        Save client data to file
+        Write all client data to the snapshot and start an empty change log
 
         Returns:
             True if successful, False otherwise
@@ -417,14 +589,36 @@ Respond with a professional, helpful solution that addresses the request.
             # Ensure directory exists
             os.makedirs(os.path.dirname(self.clients_db_path), exist_ok=True)
             
-            with open(self.clients_db_path, 'w') as f:
-                json.dump(self.clients, f, indent=2)
+            # Replace both files atomically so readers never see a partial write
+            generation = uuid.uuid4().hex
+            tmp_path = self.clients_db_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(_dump_json({**self.clients, _GENERATION_KEY: generation}, indent=True))
+            os.replace(tmp_path, self.clients_db_path)
+            self._generation = generation
             
-            return True
+            return self._reset_log()
         except Exception as e:
             logger.error(f"Error saving client data: {str(e)}")
             return False
     
+    def _reset_log(self) -> bool:
+        """
+        Replace the change log with an empty one for the current snapshot
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            tmp_path = self.clients_log_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(_dump_json({"generation": self._generation}) + b"\n")
+            os.replace(tmp_path, self.clients_log_path)
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting client change log: {str(e)}")
+            return False
+    
     def _save_client(self, name: str, email: str, status: str) -> bool:
         """
         Save or update client information
@@ -437,24 +631,30 @@ Respond with a professional, helpful solution that addresses the request.
         Returns:
             True if successful, False otherwise
         """
+        now_iso = datetime.now().isoformat()
+        
         # Create client entry if it doesn't exist
         if name not in self.clients:
-            self.clients[name] = {
+            event = {"client": name, "set": {
                 "email": email,
                 "status": status,
-                "created_date": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat(),
+                "created_date": now_iso,
+                "last_updated": now_iso,
                 "interactions": [],
                 "followups": []
-            }
+            }}
         else:
             # Update existing client
-            self.clients[name]["email"] = email
-            self.clients[name]["status"] = status
-            self.clients[name]["last_updated"] = datetime.now().isoformat()
+            event = {"client": name, "set": {
+                "email": email,
+                "status": status,
+                "last_updated": now_iso
+            }}
         
         # Save to file
-        return self._save_clients()
+        saved = self._record_event(event)
+        self._update_search_index(name)
+        return saved
     
     def _schedule_followup(self, client_name: str, days: int, followup_type: str) -> bool:
         """
@@ -473,22 +673,40 @@ Respond with a professional, helpful solution that addresses the request.
             logger.warning(f"Cannot schedule follow-up - client not found: {client_name}")
             return False
         
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
         # Calculate follow-up date
-        followup_date = (datetime.now() + timedelta(days=days)).isoformat()
+        followup_date = (now + timedelta(days=days)).isoformat()
         
         # Add follow-up
         followup = {
             "date": followup_date,
             "type": followup_type,
             "status": "pending",
-            "created": datetime.now().isoformat()
+            "created": now_iso
         }
         
-        self.clients[client_name]["followups"].append(followup)
-        self.clients[client_name]["last_updated"] = datetime.now().isoformat()
-        
         # Save to file
-        return self._save_clients()
+        saved = self._record_event({
+            "client": client_name,
+            "append": {"followups": followup},
+            "set": {"last_updated": now_iso}
+        })
+        self._push_followup(client_name, followup)
+        return saved
+    
+    def _push_followup(self, client_name: str, followup: Dict[str, Any]) -> None:
+        """
+        Add a pending follow-up to the follow-up heap
+
+        Args:
+            client_name: Client name
+            followup: Follow-up entry
+        """
+        if followup.get("status") == "pending":
+            heapq.heappush(self._followup_heap, (followup["date"], self._followup_seq, client_name, followup))
+            self._followup_seq += 1
     
     def _log_interaction(self, client_name: str, interaction_type: str, summary: str) -> bool:
         """
@@ -507,19 +725,23 @@ Respond with a professional, helpful solution that addresses the request.
             logger.warning(f"Cannot log interaction - client not found: {client_name}")
             return False
         
+        now_iso = datetime.now().isoformat()
+        
         # Create interaction entry
         interaction = {
-            "date": datetime.now().isoformat(),
+            "date": now_iso,
             "type": interaction_type,
             "summary": summary
         }
         
         # Add to client's interactions
-        self.clients[client_name]["interactions"].append(interaction)
-        self.clients[client_name]["last_updated"] = datetime.now().isoformat()
-        
-        # Save to file
-        return self._save_clients()
+        saved = self._record_event({
+            "client": client_name,
+            "append": {"interactions": interaction},
+            "set": {"last_updated": now_iso}
+        })
+        self._update_search_index(client_name)
+        return saved
     
     def get_client_info(self, client_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -543,22 +765,30 @@ Respond with a professional, helpful solution that addresses the request.
         Returns:
             List of follow-up dictionaries
         """
-        cutoff = datetime.now() + timedelta(days=days)
-        pending = []
+        cutoff = (datetime.now() + timedelta(days=days)).isoformat()
+        heap = self._followup_heap
         
-        for client_name, client_data in self.clients.items():
-            for followup in client_data.get("followups", []):
-                if followup.get("status") == "pending":
-                    followup_date = datetime.fromisoformat(followup["date"])
-                    if followup_date <= cutoff:
-                        # Add client info to followup
-                        followup_with_client = followup.copy()
-                        followup_with_client["client_name"] = client_name
-                        followup_with_client["client_email"] = client_data.get("email")
-                        pending.append(followup_with_client)
-        
-        # Sort by date
-        pending.sort(key=lambda x: x["date"])
+        # Follow-ups no longer pending are dropped once they reach the top
+        while heap and heap[0][3].get("status") != "pending":
+            heapq.heappop(heap)
+        
+        # Only visit entries due by the cutoff: a heap entry's children are never earlier
+        due = []
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            if i < len(heap) and heap[i][0] <= cutoff:
+                due.append(heap[i])
+                stack.extend((2 * i + 1, 2 * i + 2))
+        
+        pending = []
+        for _, _, client_name, followup in sorted(due):
+            if followup.get("status") == "pending":
+                # Add client info to followup
+                followup_with_client = followup.copy()
+                followup_with_client["client_name"] = client_name
+                followup_with_client["client_email"] = self.clients[client_name].get("email")
+                pending.append(followup_with_client)
         
         return pending
     
@@ -572,20 +802,56 @@ Respond with a professional, helpful solution that addresses the request.
         Returns:
             List of matching client dictionaries
         """
-        results = []
         query = query.lower()
+        results = []
+        if "\0" in query:
+            # Would only match across the field separator
+            return results
+        
+        if self._search_index is None:
+            self._search_index = {}
+            for client_name in self.clients:
+                self._update_search_index(client_name)
+        
+        # Narrow to clients that contain every trigram of the query, then confirm the match
+        if len(query) >= 3:
+            postings = sorted((self._search_index.get(gram, set()) for gram in _trigrams(query)), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            candidates = self._search_texts.keys()
         
-        for client_name, client_data in self.clients.items():
+        for client_name in sorted(candidates, key=self._search_order.__getitem__):
             # Search in name, email, status, and interactions
-            if (query in client_name.lower() or
-                query in client_data.get("email", "").lower() or
-                query in client_data.get("status", "").lower() or
-                any(query in interaction.get("summary", "").lower() 
-                    for interaction in client_data.get("interactions", []))):
-                
+            if query in self._search_texts[client_name]:
                 # Add client to results
-                client_with_name = client_data.copy()
+                client_with_name = self.clients[client_name].copy()
                 client_with_name["name"] = client_name
                 results.append(client_with_name)
         
         return results
+    
+    def _update_search_index(self, client_name: str) -> None:
+        """
+        Re-index a client's searchable text after it changes
+
+        Args:
+            client_name: Client name
+        """
+        if self._search_index is None:
+            return
+        
+        client_data = self.clients[client_name]
+        fields = [client_name, client_data.get("email", ""), client_data.get("status", "")]
+        fields.extend(interaction.get("summary", "") for interaction in client_data.get("interactions", []))
+        # Fields are searched separately, so join them with a character queries won't contain
+        text = "\0".join(fields).lower()
+        
+        old_grams = _trigrams(self._search_texts.get(client_name, ""))
+        new_grams = _trigrams(text)
+        for gram in old_grams - new_grams:
+            self._search_index[gram].discard(client_name)
+        for gram in new_grams - old_grams:
+            self._search_index.setdefault(gram, set()).add(client_name)
+        
+        self._search_texts[client_name] = text
+        self._search_order.setdefault(client_name, len(self._search_order))
@@ -10,6 +10,7 @@ import os
 import json
 import logging
 import time
+from collections import deque
 from typing import Dict, List, Any, Optional, Tuple, Union
 from queue import Queue, PriorityQueue
 from threading import Lock
@@ -129,8 +130,8 @@ class Agent:
         self.tokenizer = None
         self.prompt_template = ""
         self.system_message = ""
-        self.conversation_history = []
         self.max_history = 10  # Default max conversation history size
+        self.conversation_history = deque(maxlen=self.max_history)
     
     def initialize(self, model_loader: ModelLoader) -> bool:
         """
@@ -163,17 +164,17 @@ class Agent:
         Args:
             message: Message to add to history
         """
-        self.conversation_history.append(message.to_dict())
+        # Subclasses may change max_history after __init__; the deque evicts old messages itself
+        if self.conversation_history.maxlen != self.max_history:
+            self.conversation_history = deque(self.conversation_history, maxlen=self.max_history)
         
-        # Trim history if needed
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
+        self.conversation_history.append(message.to_dict())
     
     def clear_history(self) -> None:
         """
         Clear conversation history
         """
-        self.conversation_history = []
+        self.conversation_history.clear()
     
     def get_prompt(self, message: Message) -> str:
         """
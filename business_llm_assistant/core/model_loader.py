@@ -92,7 +92,9 @@ class ModelLoader:
                    agent_name: str,
                    force_cpu: bool = False,
                    quantization: Optional[str] = None,
-                   model_type: str = "text") -> Tuple[Any, Any]:
+                   model_type: str = "text",
+                   torch_dtype: Optional[torch.dtype] = None,
+                   attn_implementation: Optional[str] = None) -> Tuple[Any, Any]:
         """
         Load a model from Hugging Face
 
@@ -102,6 +104,8 @@ class ModelLoader:
             force_cpu: Force CPU usage even if GPU is available
             quantization: Quantization type to use (e.g., "4bit", "8bit", None for full precision)
             model_type: Type of model ("text", "vision", "multimodal")
+            torch_dtype: Weight dtype (defaults to float16 on GPU, float32 on CPU)
+            attn_implementation: Attention backend for text models (e.g., "flash_attention_2", "sdpa")
 
         Returns:
             Tuple of (model, tokenizer/processor)
@@ -119,20 +123,22 @@ class ModelLoader:
         
         # Set device
         device = "cpu" if force_cpu or not self.use_gpu else "cuda"
+        if torch_dtype is None:
+            torch_dtype = torch.float16 if device == "cuda" else torch.float32
         
         # Prepare quantization config
         quant_config = None
         if quantization == "4bit" and device == "cuda":
             quant_config = BitsAndBytesConfig(
                 load_in_4bit=True,
-                bnb_4bit_compute_dtype=torch.float16,
+                bnb_4bit_compute_dtype=torch_dtype,
                 bnb_4bit_quant_type="nf4",
                 bnb_4bit_use_double_quant=True
             )
         elif quantization == "8bit" and device == "cuda":
             quant_config = BitsAndBytesConfig(
                 load_in_8bit=True,
-                bnb_8bit_compute_dtype=torch.float16
+                bnb_8bit_compute_dtype=torch_dtype
             )
         
         try:
@@ -148,7 +154,7 @@ class ModelLoader:
                 load_params = {
                     "pretrained_model_name_or_path": model_name,
                     "device_map": "auto" if device == "cuda" else None,
-                    "torch_dtype": torch.float16 if device == "cuda" else torch.float32,
+                    "torch_dtype": torch_dtype,
                 }
                 
                 if quant_config:
@@ -175,12 +181,15 @@ class ModelLoader:
                 load_params = {
                     "pretrained_model_name_or_path": model_name,
                     "device_map": "auto" if device == "cuda" else None,
-                    "torch_dtype": torch.float16 if device == "cuda" else torch.float32,
+                    "torch_dtype": torch_dtype,
                 }
                 
                 if quant_config:
                     load_params["quantization_config"] = quant_config
                 
+                if attn_implementation and device == "cuda":
+                    load_params["attn_implementation"] = attn_implementation
+                
                 model = AutoModelForCausalLM.from_pretrained(**load_params)
                 
                 # Save loaded model and tokenizer
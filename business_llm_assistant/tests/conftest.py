@@ -0,0 +1,13 @@
+import os
+import sys
+import types
+
+# Make the agents and core packages importable, as when running from business_llm_assistant/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# core.model_loader imports torch, transformers and llama_cpp at import time. The
+# agents only need the ModelLoader name until a model is loaded, which these tests
+# never do, so they run without the ML stack.
+model_loader = types.ModuleType("core.model_loader")
+model_loader.ModelLoader = object
+sys.modules["core.model_loader"] = model_loader
@@ -0,0 +1,153 @@
+import os
+import shutil
+
+import pytest
+
+from agents.outreach import OutreachAgent
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # The agent keeps its client data under ./data
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_search_matches_substrings_across_fields(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme Corp", "sales@acme.com", "lead")
+    agent._save_client("Globex", "info@globex.com", "Active")
+    agent._save_client("Initech", "it@initech.com", "cold")
+    assert [c["name"] for c in agent.search_clients("acme")] == ["Acme Corp"]
+
+    # Changes after the index is built are picked up
+    agent._log_interaction("Initech", "call", "Asked about the ACME integration")
+    agent._save_client("Globex", "info@acme.org", "Active")
+
+    assert [c["name"] for c in agent.search_clients("ACME")] == ["Acme Corp", "Globex", "Initech"]
+    assert [c["name"] for c in agent.search_clients("active")] == ["Globex"]
+    assert [c["name"] for c in agent.search_clients("co")] == ["Acme Corp", "Initech"]
+    assert agent.search_clients("xyz") == []
+
+
+def test_change_log_replay_restores_clients(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    agent._log_interaction("Acme", "call", "Discussed pricing")
+    agent._schedule_followup("Acme", 3, "email")
+    agent._save_client("Acme", "ceo@acme.com", "won")
+
+    # Nothing was compacted, so the state comes from replaying the log
+    assert not os.path.exists(agent.clients_db_path)
+    assert OutreachAgent("outreach").clients == agent.clients
+
+
+def test_torn_log_line_is_dropped(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    with open(agent.clients_log_path, "ab") as f:
+        f.write(b'{"client": "Acme", "app')
+
+    restarted = OutreachAgent("outreach")
+    assert restarted.clients == agent.clients
+    # Appended after the restart, so it must not land on the torn line
+    restarted._log_interaction("Acme", "email", "Sent proposal")
+
+    assert OutreachAgent("outreach").clients == restarted.clients
+
+
+def test_bad_log_line_is_skipped_and_folded_into_the_snapshot(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    with open(agent.clients_log_path, "ab") as f:
+        f.write(b'{"client": "Acme", "set": \n')
+    agent._log_interaction("Acme", "call", "Discussed pricing")
+
+    restarted = OutreachAgent("outreach")
+    assert restarted.clients == agent.clients
+    restarted._log_interaction("Acme", "email", "Sent proposal")
+
+    restored = OutreachAgent("outreach")
+    assert restored.clients == restarted.clients
+    assert len(restored.clients["Acme"]["interactions"]) == 2
+
+
+def test_crash_during_compaction_does_not_replay_old_log(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    agent._log_interaction("Acme", "call", "Discussed pricing")
+    with open(agent.clients_log_path, "rb") as f:
+        stale_log = f.read()
+
+    # The snapshot was replaced but the process died before the log was reset
+    assert agent.compact()
+    with open(agent.clients_log_path, "wb") as f:
+        f.write(stale_log)
+
+    restarted = OutreachAgent("outreach")
+    assert restarted.clients == agent.clients
+    assert len(restarted.clients["Acme"]["interactions"]) == 1
+
+
+def test_copied_snapshot_keeps_its_log(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    assert agent.compact()
+    agent._log_interaction("Acme", "call", "Discussed pricing")
+
+    # Copying, touching or syncing the files changes their size and mtime, not the generation
+    os.utime(agent.clients_db_path, (1, 1))
+    shutil.copytree(workdir / "data", workdir / "copy" / "data")
+    os.chdir(workdir / "copy")
+
+    restored = OutreachAgent("outreach")
+    assert restored.clients == agent.clients
+    assert "__generation__" not in restored.clients
+
+
+def test_log_is_compacted_once_it_grows(workdir):
+    agent = OutreachAgent("outreach", compact_log_bytes=2048)
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    for i in range(50):
+        agent._log_interaction("Acme", "email", f"Note {i}")
+
+    assert os.path.getsize(agent.clients_log_path) <= 2048
+    assert OutreachAgent("outreach").clients == agent.clients
+
+
+def test_action_directives_keep_colons_in_the_last_field(workdir):
+    agent = OutreachAgent("outreach")
+    text, actions = agent._process_actions(
+        "Done. [ACTION:SAVE_CLIENT:Acme:sales@acme.com:lead]"
+        "[ACTION:LOG_INTERACTION:Acme:call:Meet at 10:30, see https://acme.com/deck]"
+        "[ACTION:SCHEDULE_FOLLOWUP:Acme:2:email][ACTION:UNKNOWN:x]"
+        "[ACTION: SAVE_CLIENT : Globex : info@globex.com : lead]"
+        "[ACTION:SAVE_CLIENT:Initech::cold]",
+        None
+    )
+
+    assert text == "Done."
+    assert [action["type"] for action in actions] == [
+        "save_client", "log_interaction", "schedule_followup", "save_client", "save_client"
+    ]
+    assert actions[1]["summary"] == "Meet at 10:30, see https://acme.com/deck"
+    assert actions[2]["days"] == 2
+    # Padding around the separators is stripped, and empty fields are kept
+    assert (actions[3]["client"], actions[3]["email"], actions[3]["status"]) == ("Globex", "info@globex.com", "lead")
+    assert (actions[4]["client"], actions[4]["email"], actions[4]["status"]) == ("Initech", "", "cold")
+
+
+def test_pending_followups_come_from_the_heap_in_date_order(workdir):
+    agent = OutreachAgent("outreach")
+    agent._save_client("Acme", "sales@acme.com", "lead")
+    agent._save_client("Globex", "info@globex.com", "lead")
+    for client, days in [("Acme", 5), ("Globex", 1), ("Acme", 30), ("Globex", 3)]:
+        agent._schedule_followup(client, days, "email")
+    agent.clients["Globex"]["followups"][1]["status"] = "completed"
+
+    due = agent.get_pending_followups(7)
+    assert [(f["client_name"], f["client_email"]) for f in due] == [
+        ("Globex", "info@globex.com"), ("Acme", "sales@acme.com")
+    ]
+    assert [f["date"] for f in due] == sorted(f["date"] for f in due)
+    assert len(agent.get_pending_followups(60)) == 3